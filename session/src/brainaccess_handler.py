@@ -16,6 +16,7 @@ BrainAccess API: https://www.brainaccess.ai/documentation/python-api/3.6.1/
 
 """
 
+import itertools
 import logging
 import threading
 import time
@@ -595,36 +596,44 @@ class BrainAccessHandler:
             self.logger.error(f"FIF save error: {e}")
             return False
     
+    def _tail_array(self, n: int, retries: int = 3) -> np.ndarray:
+        """Last n buffered samples as [samples, channels], without copying the whole deque."""
+        # The SDK callback appends from another thread; a Python-level walk can see the
+        # deque change ("deque mutated during iteration"), so retry, then fall back to
+        # list(), which copies in a single C call.
+        for _ in range(retries):
+            try:
+                out = np.empty((n, len(self.eeg_data[-1])))
+                # Walk back from the newest sample: O(n) instead of O(buffer length)
+                for i, row in enumerate(itertools.islice(reversed(self.eeg_data), n)):
+                    out[n - 1 - i] = row
+                return out
+            except RuntimeError:
+                continue
+        return np.array(list(self.eeg_data)[-n:])
+    
     def get_signal_quality(self) -> Dict[str, str]:
         """Assess signal quality for each channel."""
         if len(self.eeg_data) < self.sampling_rate:
             return {ch: 'no_data' for ch in self.channels}
         
         try:
-            recent_data = list(self.eeg_data)[-self.sampling_rate:]
-            data_array = np.array(recent_data)
+            data_array = self._tail_array(self.sampling_rate)
+            n_available = data_array.shape[1]
             
-            quality = {}
-            for idx, ch in enumerate(self.channels):
-                if idx >= data_array.shape[1]:
-                    quality[ch] = 'no_data'
-                    continue
-                
-                channel_data = data_array[:, idx]
-                std_dev = np.std(channel_data)
-                peak_to_peak = np.ptp(channel_data)
-                
-                # Quality thresholds
-                if std_dev < 1.0 or peak_to_peak < 5.0:
-                    quality[ch] = 'poor'
-                elif std_dev > 100.0 or peak_to_peak > 500.0:
-                    quality[ch] = 'poor'
-                elif std_dev > 50.0 or peak_to_peak > 200.0:
-                    quality[ch] = 'fair'
-                else:
-                    quality[ch] = 'good'
+            # One vectorized reduction over all channels (samples x channels)
+            std_dev = np.std(data_array, axis=0)
+            peak_to_peak = np.ptp(data_array, axis=0)
+            
+            # Quality thresholds: flat or very noisy -> poor, noisy -> fair
+            poor = (std_dev < 1.0) | (peak_to_peak < 5.0) | (std_dev > 100.0) | (peak_to_peak > 500.0)
+            fair = (std_dev > 50.0) | (peak_to_peak > 200.0)
+            labels = np.where(poor, 'poor', np.where(fair, 'fair', 'good'))
             
-            return quality
+            return {
+                ch: str(labels[idx]) if idx < n_available else 'no_data'
+                for idx, ch in enumerate(self.channels)
+            }
             
         except Exception as e:
             self.logger.error(f"Quality check error: {e}")
@@ -670,7 +679,7 @@ class BrainAccessHandler:
             n_available = len(self.eeg_data)
             n = min(n_samples, n_available)
             
-            data_array = np.array(list(self.eeg_data)[-n:])
+            data_array = self._tail_array(n)
             return data_array, list(self.channels)
         except Exception:
             return None, self.channels
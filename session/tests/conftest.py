@@ -0,0 +1,11 @@
+"""
+Shared pytest configuration for the P300-CIT test suite.
+
+Makes ``src/`` importable once per session so test modules can import
+experiment components (e.g. ``brainaccess_handler``) at module scope.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
@@ -30,10 +30,6 @@ from unittest.mock import Mock, patch, MagicMock
 import numpy as np
 import pandas as pd
 
-# Add parent directory to path
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
-
 from brainaccess_handler import BrainAccessHandler
 
 
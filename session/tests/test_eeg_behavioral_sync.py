@@ -15,17 +15,49 @@ Run tests::
 
 import pytest
 import time
-import tempfile
-import os
-import csv
-from pathlib import Path
 import numpy as np
 import pandas as pd
 from unittest.mock import Mock, patch
 
-# Add parent directory to path
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from brainaccess_handler import BrainAccessHandler
+
+try:
+    import pyarrow  # noqa: F401
+    _CSV_ENGINE = 'pyarrow'
+except ImportError:
+    _CSV_ENGINE = 'c'
+
+SAMPLING_RATE = 250
+CHANNELS = ['Pz', 'Cz', 'Fz', 'Fp1']
+
+
+# ---------------------------------------------------------------------------
+# Shared fixtures (built once per module)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope='module')
+def timestamps_250hz():
+    """5 s of sample timestamps at 250 Hz (float64, read-only)."""
+    timestamps = np.arange(0, 5.0, 1/SAMPLING_RATE)
+    timestamps.setflags(write=False)
+    return timestamps
+
+
+@pytest.fixture(scope='module')
+def eeg_df_250hz_5s(timestamps_250hz):
+    """Seeded 4-channel EEG (float32, ~20 µV noise) on ``timestamps_250hz``."""
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((len(timestamps_250hz), len(CHANNELS))).astype(np.float32) * 20
+    return pd.DataFrame({
+        'timestamp': timestamps_250hz,
+        **{ch: data[:, k] for k, ch in enumerate(CHANNELS)},
+    })
+
+
+@pytest.fixture(scope='module')
+def csv_dir(tmp_path_factory):
+    """Temporary directory shared by the CSV round-trip tests."""
+    return tmp_path_factory.mktemp('csv')
 
 
 class TestEEGBehavioralSynchronization:
@@ -63,28 +95,27 @@ class TestEEGBehavioralSynchronization:
         # Mock behavioral marker at 1.010 seconds
         marker_timestamp = 1.010
         
-        # Find closest EEG sample
-        time_diffs = np.abs(eeg_df['timestamp'] - marker_timestamp)
-        closest_idx = time_diffs.idxmin()
+        # Find closest EEG sample (on the raw ndarray, no Series overhead)
+        ts = eeg_df['timestamp'].to_numpy()
+        closest_idx = np.argmin(np.abs(ts - marker_timestamp))
         
         # Should be sample at 1.012 (index 3)
         assert closest_idx == 3
-        assert abs(eeg_df.loc[closest_idx, 'timestamp'] - marker_timestamp) < 0.004
+        assert abs(ts[closest_idx] - marker_timestamp) < 0.004
     
-    def test_extract_erp_window(self):
+    def test_extract_erp_window(self, timestamps_250hz):
         """Test extracting ERP time window around behavioral event."""
-        # Create mock EEG data (250 Hz, 2 seconds)
-        sampling_rate = 250
-        duration = 2.0
-        num_samples = int(sampling_rate * duration)
-        
-        timestamps = np.arange(0, duration, 1/sampling_rate)
+        # Create mock EEG data (250 Hz, 5 seconds)
+        sampling_rate = SAMPLING_RATE
+        timestamps = timestamps_250hz
+        num_samples = len(timestamps)
         
         # Simulate P300 response: baseline + positive deflection at 300ms
         baseline = 0
         p300_latency = 0.3  # 300ms
         
-        eeg_signal = np.zeros(num_samples)
+        # Channel data in float32; timestamps stay float64 (µs precision)
+        eeg_signal = np.zeros(num_samples, dtype=np.float32)
         # Add P300 component (Gaussian bump at 300ms)
         for i, t in enumerate(timestamps):
             if 0.2 < t < 0.5:  # P300 window
@@ -118,7 +149,7 @@ class TestEEGBehavioralSynchronization:
         peak_time = window_data.loc[max_idx, 'timestamp']
         assert 0.25 < peak_time < 0.35  # P300 typically 250-350ms
     
-    def test_behavioral_csv_with_lsl_markers(self):
+    def test_behavioral_csv_with_lsl_markers(self, csv_dir):
         """Test behavioral CSV contains LSL marker IDs for synchronization."""
         # Create mock behavioral data with LSL markers
         behavioral_data = [
@@ -140,36 +171,25 @@ class TestEEGBehavioralSynchronization:
             }
         ]
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Save behavioral data
-            csv_file = os.path.join(tmpdir, 'behavioral.csv')
-            with open(csv_file, 'w', newline='') as f:
-                fieldnames = behavioral_data[0].keys()
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(behavioral_data)
-            
-            # Read back and verify
-            df = pd.read_csv(csv_file)
-            assert 'LSL_S1_marker' in df.columns
-            assert 'LSL_S2_marker' in df.columns
-            assert df['LSL_S1_marker'].tolist() == [1, 3]
-            assert df['LSL_S2_marker'].tolist() == [2, 4]
+        # Save behavioral data
+        csv_file = csv_dir / 'behavioral.csv'
+        pd.DataFrame(behavioral_data).to_csv(csv_file, index=False)
+        
+        # Read back and verify
+        df = pd.read_csv(
+            csv_file,
+            engine=_CSV_ENGINE,
+            dtype={'LSL_S1_marker': 'int32', 'LSL_S2_marker': 'int32'},
+        )
+        assert 'LSL_S1_marker' in df.columns
+        assert 'LSL_S2_marker' in df.columns
+        assert df['LSL_S1_marker'].tolist() == [1, 3]
+        assert df['LSL_S2_marker'].tolist() == [2, 4]
     
-    def test_synchronize_eeg_with_behavioral(self):
+    def test_synchronize_eeg_with_behavioral(self, eeg_df_250hz_5s):
         """Test complete synchronization of EEG and behavioral data."""
-        # Create mock EEG data
-        sampling_rate = 250
-        duration = 5.0
-        timestamps = np.arange(0, duration, 1/sampling_rate)
-        
-        eeg_df = pd.DataFrame({
-            'timestamp': timestamps,
-            'Pz': np.random.randn(len(timestamps)) * 20,
-            'Cz': np.random.randn(len(timestamps)) * 20,
-            'Fz': np.random.randn(len(timestamps)) * 20,
-            'Fp1': np.random.randn(len(timestamps)) * 20
-        })
+        # Mock EEG data (250 Hz, 5 seconds, float32 channels)
+        eeg_df = eeg_df_250hz_5s
         
         # Create mock behavioral data
         behavioral_df = pd.DataFrame({
@@ -179,85 +199,80 @@ class TestEEGBehavioralSynchronization:
             'S2_onset_time': [2.4, 3.9, 5.4],
         })
         
-        # For each trial, extract EEG window around S1 onset
-        erp_windows = []
-        
-        for _, trial in behavioral_df.iterrows():
-            event_time = trial['S1_onset_time']
-            
-            # Extract -100ms to +800ms window
-            window_mask = (
-                (eeg_df['timestamp'] >= event_time - 0.1) &
-                (eeg_df['timestamp'] <= event_time + 0.8)
-            )
-            window = eeg_df[window_mask].copy()
-            
-            if len(window) > 0:
-                # Add trial info
-                window['trial'] = trial['trial_index']
-                window['stimulus_type'] = trial['S1_type']
-                # Time relative to stimulus onset
-                window['time_rel'] = window['timestamp'] - event_time
-                
-                erp_windows.append(window)
+        # Locate all -100ms to +800ms windows around S1 onset at once
+        ts = eeg_df['timestamp'].to_numpy()
+        events = behavioral_df['S1_onset_time'].to_numpy()
+        starts = np.searchsorted(ts, events - 0.1, side='left')
+        ends = np.searchsorted(ts, events + 0.8, side='right')
+        
+        # Gather every window's sample indices, then build one DataFrame with
+        # trial metadata repeated vectorially (no per-trial copy / assign)
+        channels = CHANNELS
+        lengths = ends - starts
+        idx = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        eeg_arr = eeg_df[channels].to_numpy()
+        erp_df = pd.DataFrame({
+            'timestamp': ts[idx],
+            **{ch: eeg_arr[idx, k] for k, ch in enumerate(channels)},
+            'trial': np.repeat(behavioral_df['trial_index'].to_numpy(), lengths),
+            'stimulus_type': np.repeat(behavioral_df['S1_type'].to_numpy(), lengths),
+            # Time relative to stimulus onset
+            'time_rel': ts[idx] - np.repeat(events, lengths),
+        })
         
         # Verify we extracted windows for all trials
-        assert len(erp_windows) == 3
+        assert erp_df['trial'].nunique() == 3
         
         # Verify time windows are correct
-        for window in erp_windows:
-            assert window['time_rel'].min() >= -0.1
-            assert window['time_rel'].max() <= 0.8
+        window_bounds = erp_df.groupby('trial')['time_rel'].agg(['min', 'max'])
+        assert (window_bounds['min'] >= -0.1).all()
+        assert (window_bounds['max'] <= 0.8).all()
     
     def test_lsl_timestamp_precision(self):
         """Test LSL timestamp precision is sufficient for EEG analysis."""
         # LSL timestamps should have sub-millisecond precision
         # For 250 Hz EEG (4ms samples), we need < 1ms precision
         
-        # Simulate LSL timestamps
-        timestamps = []
-        for i in range(100):
-            ts = time.time()
-            timestamps.append(ts)
-            time.sleep(0.001)  # 1ms intervals
+        # Sample the high-resolution clock back-to-back (no sleep(), which
+        # resolves to ~15 ms on Windows and only measures scheduler jitter)
+        stamps = np.empty(10000, dtype=np.int64)
+        for i in range(len(stamps)):
+            stamps[i] = time.perf_counter_ns()
         
-        # Calculate intervals
-        intervals = np.diff(timestamps)
+        # Calculate intervals (ns)
+        intervals = np.diff(stamps)
         
-        # Intervals should be close to 1ms (0.001s)
-        # Allow some jitter from sleep() imprecision
-        assert np.mean(intervals) == pytest.approx(0.001, abs=0.0005)
+        # Clock must be monotonic with sub-microsecond resolution
+        assert intervals.min() >= 0
+        assert np.median(intervals) < 1_000
     
-    def test_channel_order_consistency(self):
+    def test_channel_order_consistency(self, csv_dir):
         """Test that channel order is consistent between config and data."""
         expected_channels = ['Pz', 'Cz', 'Fz', 'Fp1']
         
         # Simulate saved EEG data
-        with tempfile.TemporaryDirectory() as tmpdir:
-            csv_file = os.path.join(tmpdir, 'test_eeg.csv')
-            
-            # Create mock data
-            data = {
-                'timestamp': [1.0, 1.004, 1.008],
-                'Pz': [10.0, 11.0, 12.0],
-                'Cz': [8.0, 9.0, 10.0],
-                'Fz': [5.0, 6.0, 7.0],
-                'Fp1': [3.0, 4.0, 5.0]
-            }
-            df = pd.DataFrame(data)
-            df.to_csv(csv_file, index=False)
-            
-            # Read back and verify column order
-            df_read = pd.read_csv(csv_file)
-            data_columns = [col for col in df_read.columns if col != 'timestamp']
-            
-            assert data_columns == expected_channels
+        csv_file = csv_dir / 'test_eeg.csv'
+        
+        # Create mock data
+        data = {
+            'timestamp': [1.0, 1.004, 1.008],
+            'Pz': [10.0, 11.0, 12.0],
+            'Cz': [8.0, 9.0, 10.0],
+            'Fz': [5.0, 6.0, 7.0],
+            'Fp1': [3.0, 4.0, 5.0]
+        }
+        df = pd.DataFrame(data)
+        df.to_csv(csv_file, index=False)
+        
+        # Read back and verify column order
+        df_read = pd.read_csv(csv_file, engine=_CSV_ENGINE)
+        data_columns = [col for col in df_read.columns if col != 'timestamp']
+        
+        assert data_columns == expected_channels
     
     @pytest.mark.mock
     def test_real_time_quality_check(self):
         """Test real-time signal quality during experiment."""
-        from brainaccess_handler import BrainAccessHandler
-        
         # Create handler with mock data
         handler = BrainAccessHandler(enabled=False, sampling_rate=250)
         handler.channel_mapping = {'Pz': 0, 'Cz': 1, 'Fz': 2, 'Fp1': 3}
@@ -286,22 +301,16 @@ class TestEEGBehavioralSynchronization:
 class TestDataIntegrity:
     """Test data integrity and completeness."""
     
-    def test_no_data_loss_during_recording(self):
+    def test_no_data_loss_during_recording(self, timestamps_250hz):
         """Test that no data samples are lost during recording."""
-        # Simulate continuous recording
-        sampling_rate = 250
-        duration = 5.0
-        expected_samples = int(sampling_rate * duration)
-        
-        # Generate timestamps at exact intervals
-        timestamps = np.arange(0, duration, 1/sampling_rate)
-        
-        # Check for gaps in timestamps
-        intervals = np.diff(timestamps)
-        expected_interval = 1/sampling_rate
-        
-        # All intervals should be equal (no missing samples)
-        assert np.allclose(intervals, expected_interval, rtol=1e-5)
+        # Simulate continuous recording (timestamps at exact intervals)
+        sampling_rate = SAMPLING_RATE
+        timestamps = timestamps_250hz
+        
+        # Check for gaps in timestamps: every sample must sit on the
+        # expected grid (no missing samples), checked in a single pass
+        expected = np.arange(len(timestamps)) * (1/sampling_rate)
+        assert np.max(np.abs(timestamps - expected)) < 1e-8
     
     def test_behavioral_trial_count_matches_config(self):
         """Test that number of recorded trials matches config."""
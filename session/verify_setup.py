@@ -15,9 +15,11 @@ Usage
 """
 
 import os
+import re
 import sys
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 
 try:
     import yaml
@@ -25,14 +27,38 @@ try:
 except ImportError:
     YAML_AVAILABLE = False
 
+# probe_<object>_view*.<ext> / irr_<object>_view*.<ext>; object names may contain
+# underscores (see TrialGenerator._extract_object_name)
+_VIEW_RE = re.compile(r'^(probe|irr)_(.+)_view.*\.(jpe?g|png)$')
+
 
 # ---------------------------------------------------------------------------
 # Generic helpers
 # ---------------------------------------------------------------------------
 
-def check_file(filepath: str, description: str) -> bool:
-    """Check whether a file exists and print the result."""
-    if os.path.exists(filepath):
+def list_files(dirpath: Path) -> Set[str]:
+    """Return names of regular files in a directory (single scandir call)."""
+    if not dirpath.is_dir():
+        return set()
+    with os.scandir(dirpath) as it:
+        return {e.name for e in it if e.is_file()}
+
+
+def check_file(
+    filepath: str,
+    description: str,
+    existing: Optional[Set[str]] = None,
+) -> bool:
+    """Check whether a file exists and print the result.
+
+    If ``existing`` (from :func:`list_files` on the file's directory) is
+    given, membership is tested there instead of stat-ing the path.
+    """
+    if existing is None:
+        found = os.path.exists(filepath)
+    else:
+        found = os.path.basename(filepath) in existing
+    if found:
         print(f"  [OK]      {description}")
         return True
     print(f"  [MISSING] {description}: {filepath}")
@@ -64,15 +90,34 @@ def load_config(config_path: Path) -> dict:
         return yaml.safe_load(fh) or {}
 
 
-def discover_views(images_dir: Path, prefix: str, obj_name: str) -> List[Path]:
-    """Return sorted list of view files for one object (probe or irr)."""
+def scan_views(images_dir: Path) -> Dict[Tuple[str, str], List[Path]]:
+    """Index all view files in one directory scan, keyed by (prefix, object)."""
     if not images_dir.is_dir():
-        return []
-    extensions = ('jpg', 'jpeg', 'png')
-    views = []
-    for ext in extensions:
-        views.extend(sorted(images_dir.glob(f'{prefix}_{obj_name}_view*.{ext}')))
-    return sorted(set(views))
+        return {}
+    by_key: Dict[Tuple[str, str], List[Path]] = defaultdict(list)
+    with os.scandir(images_dir) as it:
+        for entry in it:
+            m = _VIEW_RE.match(entry.name)
+            if m:
+                key = (m.group(1), m.group(2))
+                by_key[key].append(images_dir / entry.name)
+    return {key: sorted(views) for key, views in by_key.items()}
+
+
+def discover_views(
+    images_dir: Path,
+    prefix: str,
+    obj_name: str,
+    index: Optional[Dict[Tuple[str, str], List[Path]]] = None,
+) -> List[Path]:
+    """Return sorted list of view files for one object (probe or irr).
+
+    Pass a prebuilt ``index`` from :func:`scan_views` to avoid rescanning
+    the directory for every object.
+    """
+    if index is None:
+        index = scan_views(images_dir)
+    return index.get((prefix, obj_name), [])
 
 
 def check_images_from_config(
@@ -99,10 +144,11 @@ def check_images_from_config(
     checks = []
     probe_views: Dict[str, int] = {}
     irr_views: Dict[str, int] = {}
+    index = scan_views(images_dir)
 
     # Probe
     if probe_obj:
-        views = discover_views(images_dir, 'probe', probe_obj)
+        views = discover_views(images_dir, 'probe', probe_obj, index)
         n = len(views)
         probe_views[probe_obj] = n
         label = f"probe_{probe_obj}: {n} view(s) found"
@@ -116,7 +162,7 @@ def check_images_from_config(
 
     # Irrelevants
     for obj in irr_objs:
-        views = discover_views(images_dir, 'irr', obj)
+        views = discover_views(images_dir, 'irr', obj, index)
         n = len(views)
         irr_views[obj] = n
         label = f"irr_{obj}: {n} view(s) found"
@@ -171,6 +217,7 @@ def main() -> int:
     print("=" * 60)
 
     checks: List[bool] = []
+    root_files = list_files(root)
 
     # ------------------------------------------------------------------
     # [1] Directories
@@ -185,8 +232,8 @@ def main() -> int:
     # [2] Core files
     # ------------------------------------------------------------------
     print("\n[2] Core files...")
-    checks.append(check_file(str(root / 'requirements.txt'), "requirements.txt"))
-    checks.append(check_file(str(root / 'README.md'), "README.md"))
+    checks.append(check_file(str(root / 'requirements.txt'), "requirements.txt", root_files))
+    checks.append(check_file(str(root / 'README.md'), "README.md", root_files))
 
     # ------------------------------------------------------------------
     # [3] Configuration
@@ -198,6 +245,7 @@ def main() -> int:
     # [4] Source code
     # ------------------------------------------------------------------
     print("\n[4] Source code...")
+    src_files = list_files(root / 'src')
     for fname, desc in [
         ('src/__init__.py', "Source package init"),
         ('src/experiment.py', "Main experiment script"),
@@ -206,26 +254,27 @@ def main() -> int:
         ('src/brainaccess_handler.py', "BrainAccess handler"),
         ('src/utils.py', "Utils module"),
     ]:
-        checks.append(check_file(str(root / fname), desc))
+        checks.append(check_file(str(root / fname), desc, src_files))
 
     # ------------------------------------------------------------------
     # [5] Helper scripts
     # ------------------------------------------------------------------
     print("\n[5] Scripts...")
+    script_files = list_files(root / 'scripts')
     for fname, desc in [
         ('scripts/normalize_images.py', "Image normalization"),
         ('scripts/generate_metadata.py', "Metadata generation"),
         ('scripts/test_trial_generation.py', "Trial generation tests"),
         ('scripts/eeg_analyzer_app.py', "EEG analyzer (Streamlit)"),
     ]:
-        checks.append(check_file(str(root / fname), desc))
+        checks.append(check_file(str(root / fname), desc, script_files))
 
     # ------------------------------------------------------------------
     # [6] Launcher scripts
     # ------------------------------------------------------------------
     print("\n[6] Launchers...")
-    checks.append(check_file(str(root / 'run_experiment.bat'), "run_experiment.bat (Windows)"))
-    checks.append(check_file(str(root / 'run_experiment.sh'), "run_experiment.sh (Linux/Mac)"))
+    checks.append(check_file(str(root / 'run_experiment.bat'), "run_experiment.bat (Windows)", root_files))
+    checks.append(check_file(str(root / 'run_experiment.sh'), "run_experiment.sh (Linux/Mac)", root_files))
 
     # ------------------------------------------------------------------
     # [7] Images — derived from config
@@ -252,10 +301,13 @@ def main() -> int:
             print(f"    irr_{obj}: {n} view(s)")
     else:
         # Fallback: just count images
-        n_images = sum(
-            1 for f in images_dir.iterdir()
-            if f.suffix.lower() in ('.jpg', '.jpeg', '.png')
-        ) if images_dir.is_dir() else 0
+        n_images = 0
+        if images_dir.is_dir():
+            with os.scandir(images_dir) as it:
+                n_images = sum(
+                    1 for e in it
+                    if e.name.rpartition('.')[2].lower() in ('jpg', 'jpeg', 'png')
+                )
         print(f"  Found {n_images} image file(s) in images/  "
               "(install PyYAML for config-based checks)")
         checks.append(n_images > 0)
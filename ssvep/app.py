@@ -3,16 +3,23 @@ SSVEP demo app: three flickering squares + rest (static) square; optional calibr
 
 Run with BrainAccess Board running and cap on. Look at one square; the app highlights
 it when the corresponding frequency is detected. Rest = look at static square or away.
-F2 = open power spectrum in a separate window. Flicker is synced to monitor refresh rate
-when display.refresh_rate_hz is set in config.
+F2 = toggle power spectrum overlay in the app window; F3 = open it in a separate
+window (e.g. on a second monitor, away from the stimuli). Flicker is driven by a
+frame counter on a vsync'd display, so it is locked to the monitor refresh rate
+(display.refresh_rate_hz, or the rate reported by the display driver when not set).
 """
 
+import atexit
+import functools
+import math
 import subprocess
 import sys
-import tempfile
+import threading
 import time
+import traceback
+from multiprocessing import shared_memory
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 import pygame
@@ -21,15 +28,265 @@ from eeg_stream import EEGStream, load_config
 from ssvep_analysis import (
     bandpass_filter,
     compute_power_spectrum,
-    detect_ssvep_multi,
-    get_smoothed_selection,
+    design_bandpass,
+    make_detector,
+    make_sos_filtfilt,
+    preprocess,
 )
 from signal_quality import (
     compute_channel_stats,
     overall_status,
 )
 
-CHART_DATA_PATH = Path(tempfile.gettempdir()) / "ssvep_power.npy"
+
+# Power chart IPC: float64 array in a SharedMemory block attached by chart_viewer.py
+# (block name passed on the command line). Layout: [version, n, freqs[0:n], powers[0:n]];
+# version is odd while a write is in progress and even when the payload is consistent.
+def _release_chart_buffer(shm: shared_memory.SharedMemory) -> None:
+    """Close and unlink the chart block (registered with atexit)."""
+    try:
+        shm.close()
+    except BufferError:
+        pass  # array views still alive at exit; unlink below still frees the name
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _open_chart_buffer(
+    n_max: int,
+) -> Tuple[Optional[shared_memory.SharedMemory], Optional[np.ndarray]]:
+    """Create the shared chart block for up to n_max frequency bins ((None, None) on failure)."""
+    n_values = 2 + 2 * n_max
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=8 * n_values)
+    except OSError:
+        return None, None
+    atexit.register(_release_chart_buffer, shm)
+    mm = np.ndarray((n_values,), dtype=np.float64, buffer=shm.buf)
+    mm[:] = 0.0
+    return shm, mm
+
+
+def _write_chart_buffer(mm: np.ndarray, freqs: np.ndarray, powers: np.ndarray) -> None:
+    """Publish (freqs, powers) into the shared chart array; reader skips unchanged versions."""
+    n = min(len(freqs), (mm.shape[0] - 2) // 2)
+    mm[0] += 1  # odd: write in progress
+    mm[1] = n
+    mm[2:2 + n] = freqs[:n]
+    mm[2 + n:2 + 2 * n] = powers[:n]
+    mm[0] += 1  # even: payload consistent
+
+
+def _set_display_mode(size: tuple, flags: int) -> pygame.surface.Surface:
+    """Open the window with vsync so flips land on vblank; fall back if unsupported."""
+    try:
+        return pygame.display.set_mode(size, flags, vsync=1)
+    except pygame.error:
+        return pygame.display.set_mode(size, flags)
+
+
+def _resolve_refresh_rate(disp_cfg: dict) -> float:
+    """Refresh rate (Hz) for frame-based flicker: config value, else display driver, else 60."""
+    configured = disp_cfg.get("refresh_rate_hz")
+    if configured and configured > 0:
+        return float(configured)
+    get_rate = getattr(pygame.display, "get_current_refresh_rate", None)  # pygame-ce
+    if get_rate is not None:
+        try:
+            rate = get_rate()
+            if rate and rate > 0:
+                return float(rate)
+        except pygame.error:
+            pass
+    return 60.0
+
+
+def _frames_per_half_period(refresh_rate_hz: float, freq_hz: float) -> int:
+    """Number of frames per flicker half-period (state toggles every this many frames)."""
+    return max(1, int(round(refresh_rate_hz / (2 * freq_hz))))
+
+
+def _flicker_table(frames_per_half: List[int]) -> List[Tuple[int, ...]]:
+    """
+    Flicker states (0 = off, 1 = on) of each square for one common period of frames.
+    Row `frame_count % len(table)` matches toggling every frames_per_half[i] frames
+    starting from state 1 (first toggle on frame 0).
+    """
+    fph = np.asarray(frames_per_half, dtype=np.int64)
+    period = math.lcm(*(2 * int(f) for f in fph))
+    frames = np.arange(period, dtype=np.int64)[:, None]
+    states = ((frames // fph) % 2).astype(np.uint8)
+    return [tuple(row) for row in states.tolist()]
+
+
+def _square_layout(w: int, h: int, sq_size: int, gap: int) -> Tuple[pygame.Rect, ...]:
+    """Rects (left, center, right, rest) for the stimulus squares in a w x h window."""
+    cx, cy = w // 2, h // 2
+    return (
+        pygame.Rect(cx - gap - sq_size, cy - sq_size // 2, sq_size, sq_size),
+        pygame.Rect(cx - sq_size // 2, cy - sq_size // 2, sq_size, sq_size),
+        pygame.Rect(cx + gap, cy - sq_size // 2, sq_size, sq_size),
+        pygame.Rect(cx - sq_size // 2, cy + gap - sq_size // 2, sq_size, sq_size),
+    )
+
+
+# Rendered text surfaces keyed by (font, text, color); the key keeps the font alive
+_text_cache: Dict[Tuple[pygame.font.Font, str, tuple], pygame.surface.Surface] = {}
+_TEXT_CACHE_MAX = 256
+
+
+def render_cached(font: pygame.font.Font, text: str, color: tuple) -> pygame.surface.Surface:
+    """Anti-aliased font.render, rasterized once per (font, text, color) and reused."""
+    key = (font, text, color)
+    surf = _text_cache.get(key)
+    if surf is None:
+        if len(_text_cache) >= _TEXT_CACHE_MAX:
+            _text_cache.clear()
+        surf = font.render(text, True, color).convert_alpha()
+        _text_cache[key] = surf
+    return surf
+
+
+def _make_square_surface(size: int, color: tuple) -> pygame.surface.Surface:
+    """Solid square in display pixel format, pre-rendered once and blitted per frame."""
+    surf = pygame.Surface((size, size)).convert()
+    surf.fill(color)
+    return surf
+
+
+def _blit_batch(screen: pygame.surface.Surface, items: list) -> None:
+    """Blit (surface, dest) pairs in one call: fblits (pygame-ce 2.1.4+) or blits(doreturn=False)."""
+    fblits = getattr(screen, "fblits", None)
+    if fblits is not None:
+        fblits(items)
+    else:
+        screen.blits(items, doreturn=False)
+
+
+def _draw_spectrum(
+    screen: pygame.surface.Surface,
+    rect: pygame.Rect,
+    freqs: np.ndarray,
+    powers: np.ndarray,
+    color: tuple = (80, 180, 220),
+) -> None:
+    """Draw power spectrum as an anti-aliased polyline inside `rect` (auto-scaled to max)."""
+    pygame.draw.rect(screen, (20, 22, 26), rect)
+    pygame.draw.rect(screen, (74, 107, 58), rect, width=1)
+    if freqs is None or powers is None or len(freqs) < 2:
+        return
+    f_span = float(freqs[-1] - freqs[0]) or 1.0
+    p_max = float(np.max(powers)) or 1e-12
+    x = rect.left + (freqs - freqs[0]) / f_span * (rect.width - 1)
+    y = rect.bottom - 1 - powers / (p_max * 1.05) * (rect.height - 1)
+    pygame.draw.aalines(screen, color, False, np.column_stack((x, y)).tolist())
+
+
+class AnalysisWorker(threading.Thread):
+    """
+    Background EEG analysis at a fixed rate, decoupled from the render loop.
+
+    Every `interval_sec` it takes the last `window_sec` of EEG, runs SSVEP
+    detection (+ smoothing) and, while `chart_enabled` is set, the power spectrum, and
+    publishes the latest result in `result` under `lock`. The render loop only
+    reads that slot, so CCA/FFT work never eats into the flicker frame budget.
+    """
+
+    def __init__(
+        self,
+        stream: EEGStream,
+        detector: Callable[..., Tuple[int, List[float]]],
+        window_sec: float,
+        fs: float,
+        spectrum_kwargs: Dict[str, Any],
+        n_classes: int,
+        smooth_count: int = 2,
+        interval_sec: float = 0.1,
+        chart_buffer: Optional[np.ndarray] = None,
+        preprocess_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ) -> None:
+        super().__init__(name="ssvep-analysis", daemon=True)
+        self.stream = stream
+        self.detector = detector
+        self.window_sec = window_sec
+        self.fs = fs
+        self.spectrum_kwargs = spectrum_kwargs
+        self.n_classes = n_classes
+        self.smooth_count = smooth_count
+        self.interval_sec = interval_sec
+        self.chart_buffer = chart_buffer
+        # When set, the window is filtered + CAR'd once and shared by spectrum and detector
+        self.preprocess_fn = preprocess_fn
+        self.lock = threading.Lock()
+        self.result: Dict[str, Any] = {"detected_idx": None, "freqs": None, "powers": None, "error": None}
+        self._last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+        # Set by the render loop while a chart (overlay or F3 window) is visible
+        self.chart_enabled = threading.Event()
+        # Smoothing state: class of the current run of identical detections and its length
+        self._streak_class = -1
+        self._streak_len = 0
+        # Skip a tick unless at least fs/10 new samples arrived since the last analysis
+        self.min_new_samples = max(1, int(fs // 10))
+        self._last_analyzed = -self.min_new_samples
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_sec):
+            try:
+                self._analyze_once()
+            except Exception as e:
+                # Keep analysing: a dead thread would leave the squares flickering with no
+                # feedback. Print each distinct error once and show it in the render loop.
+                msg = f"{type(e).__name__}: {e}"
+                if msg != self._last_error:
+                    self._last_error = msg
+                    traceback.print_exc()
+                with self.lock:
+                    self.result = {"detected_idx": None, "freqs": None, "powers": None, "error": msg}
+
+    def _analyze_once(self) -> None:
+        received = self.stream.samples_received
+        if received - self._last_analyzed < self.min_new_samples:
+            return  # window has not advanced enough (e.g. stream stalled)
+        data, _ = self.stream.get_recent(self.window_sec)
+        if data is None or data.shape[0] < self.fs * 0.5:
+            return
+        self._last_analyzed = received
+        # Power spectrum only while a chart is shown (F2 overlay / F3 window)
+        freqs_plot, powers_plot = None, None
+        filtered: Optional[np.ndarray] = None
+        if self.chart_enabled.is_set():
+            if self.preprocess_fn is not None:
+                filtered = self.preprocess_fn(data)
+                freqs_plot, powers_plot = compute_power_spectrum(
+                    filtered, self.fs, preprocessed=True, **self.spectrum_kwargs
+                )
+            else:
+                freqs_plot, powers_plot = compute_power_spectrum(data, self.fs, **self.spectrum_kwargs)
+            if self.chart_buffer is not None:
+                _write_chart_buffer(self.chart_buffer, freqs_plot, powers_plot)
+        # SSVEP detection (3 targets + optional rest)
+        idx, _ = self.detector(data, filtered)
+        # Map detector -1 (rest) -> 3
+        cls = 3 if idx == -1 else idx
+        # O(1) equivalent of get_smoothed_selection: the last `smooth_count` results
+        # agree iff the current run of identical results is at least that long
+        if cls == self._streak_class:
+            self._streak_len += 1
+        else:
+            self._streak_class, self._streak_len = cls, 1
+        detected_idx: Optional[int] = None
+        if self._streak_len >= self.smooth_count and 0 <= cls < self.n_classes:
+            detected_idx = cls
+        with self.lock:
+            self.result = {
+                "detected_idx": detected_idx, "freqs": freqs_plot, "powers": powers_plot, "error": None
+            }
 
 
 def _run_confirm_before_signal_check(
@@ -52,12 +309,12 @@ def _run_confirm_before_signal_check(
     btn_color = (80, 140, 200)
     btn_hover = (100, 160, 220)
 
-    while True:
+    def redraw() -> None:
         screen.fill(bg)
-        title = font_m.render("EEG connected.", True, white)
+        title = render_cached(font_m, "EEG connected.", white)
         tr = title.get_rect(center=(w // 2, h // 2 - 80))
         screen.blit(title, tr)
-        sub = font_l.render("Start signal quality check?", True, gray)
+        sub = render_cached(font_l, "Start signal quality check?", gray)
         sr = sub.get_rect(center=(w // 2, h // 2 - 45))
         screen.blit(sub, sr)
         # Button
@@ -65,14 +322,21 @@ def _run_confirm_before_signal_check(
         hover = btn_rect.collidepoint(mouse)
         color = btn_hover if hover else btn_color
         pygame.draw.rect(screen, color, btn_rect, border_radius=8)
-        lbl = font_l.render("Start check", True, white)
+        lbl = render_cached(font_l, "Start check", white)
         lr = lbl.get_rect(center=btn_rect.center)
         screen.blit(lbl, lr)
-        hint = font_l.render("or press SPACE  |  ESC = quit", True, gray)
+        hint = render_cached(font_l, "or press SPACE  |  ESC = quit", gray)
         hr = hint.get_rect(center=(w // 2, h // 2 + 60))
         screen.blit(hint, hr)
         pygame.display.flip()
-        for event in pygame.event.get():
+
+    # Event-driven: block until input arrives, redraw only on events (hover via MOUSEMOTION)
+    redraw()
+    while True:
+        events = [pygame.event.wait(200)] + pygame.event.get()
+        if any(event.type != pygame.NOEVENT for event in events):
+            redraw()
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
             if event.type == pygame.KEYDOWN:
@@ -83,10 +347,52 @@ def _run_confirm_before_signal_check(
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if btn_rect.collidepoint(event.pos):
                     return True
-        time.sleep(0.05)
     return False
 
 
+def _run_collect_screen(
+    screen: pygame.surface.Surface,
+    collect_sec: float,
+    disp_cfg: dict,
+) -> bool:
+    """
+    Show a progress bar while the EEG buffer fills for the quality check.
+    Keeps the window responsive (events pumped). Returns False on ESC/quit.
+    """
+    bg = tuple(disp_cfg.get("background_rgb", [30, 30, 35]))
+    white = (255, 255, 255)
+    gray = (180, 180, 180)
+    bar_color = (80, 140, 200)
+    font_m = pygame.font.Font(None, 36)
+    font_l = pygame.font.Font(None, 28)
+    clock = pygame.time.Clock()
+    w, h = screen.get_size()
+    title = render_cached(font_m, "Collecting signal...", white)
+    hint = render_cached(font_l, "ESC = quit", gray)
+    bar_w, bar_h = 400, 16
+    bar_rect = pygame.Rect((w - bar_w) // 2, h // 2 - bar_h // 2, bar_w, bar_h)
+
+    t0 = time.perf_counter()
+    while True:
+        elapsed = time.perf_counter() - t0
+        if elapsed >= collect_sec:
+            return True
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                return False
+        screen.fill(bg)
+        screen.blit(title, title.get_rect(center=(w // 2, h // 2 - 50)))
+        pygame.draw.rect(screen, gray, bar_rect, width=1, border_radius=4)
+        fill = bar_rect.copy()
+        fill.width = int(bar_w * elapsed / collect_sec) if collect_sec > 0 else bar_w
+        pygame.draw.rect(screen, bar_color, fill, border_radius=4)
+        screen.blit(hint, hint.get_rect(center=(w // 2, h // 2 + 40)))
+        pygame.display.flip()
+        clock.tick(30)
+
+
 def _run_signal_quality_screen(
     screen: pygame.surface.Surface,
     stats: list,
@@ -110,20 +416,20 @@ def _run_signal_quality_screen(
     line_h = 24
     col_w = 90
 
-    while True:
+    def redraw() -> None:
         screen.fill(bg)
         y = 30
-        title = font_m.render("Signal quality check", True, white)
+        title = render_cached(font_m, "Signal quality check", white)
         screen.blit(title, (30, y))
         y += 50
         status_color = green if ok_to_proceed else amber
-        status = font_m.render(status_msg[:80], True, status_color)
+        status = render_cached(font_m, status_msg[:80], status_color)
         screen.blit(status, (30, y))
         y += 45
         # Header
         headers = ["Channel", "Mean (µV)", "Std (µV)", "Min", "Max", "PtP (µV)", "Quality"]
         for i, h in enumerate(headers):
-            t = font_l.render(h, True, gray)
+            t = render_cached(font_l, h, gray)
             screen.blit(t, (30 + i * col_w, y))
         y += line_h + 5
         for s in stats:
@@ -139,18 +445,25 @@ def _run_signal_quality_screen(
                 q.upper(),
             ]
             for i, cell in enumerate(row):
-                t = font_l.render(cell, True, white if i != 6 else qcolor)
+                t = render_cached(font_l, cell, white if i != 6 else qcolor)
                 screen.blit(t, (30 + i * col_w, y))
             y += line_h
             snippet_str = ", ".join(f"{v:.1f}" for v in s["snippet"][:8])
-            t = font_s.render(f"  snippet: [{snippet_str}]", True, gray)
+            t = render_cached(font_s, f"  snippet: [{snippet_str}]", gray)
             screen.blit(t, (30, y))
             y += line_h
         y += 20
-        inst = font_m.render("SPACE = continue | ESC = quit", True, gray)
+        inst = render_cached(font_m, "SPACE = continue | ESC = quit", gray)
         screen.blit(inst, (30, y))
         pygame.display.flip()
-        for event in pygame.event.get():
+
+    # Static content: block until input arrives, redraw only on events (e.g. expose/resize)
+    redraw()
+    while True:
+        events = [pygame.event.wait(200)] + pygame.event.get()
+        if any(event.type != pygame.NOEVENT for event in events):
+            redraw()
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
             if event.type == pygame.KEYDOWN:
@@ -158,7 +471,6 @@ def _run_signal_quality_screen(
                     return False
                 if event.key == pygame.K_SPACE:
                     return True
-        time.sleep(0.05)
     return True
 
 
@@ -174,6 +486,7 @@ def _run_calibration(
     pre_cfg: dict,
     stim_cfg: dict,
     eeg_cfg: dict,
+    refresh_rate_hz: float,
 ) -> Optional[float]:
     """
     Run calibration: user looks at LEFT, CENTER, RIGHT, then REST (gray square).
@@ -196,9 +509,14 @@ def _run_calibration(
     color_rest = tuple(disp_cfg.get("rest_square_color", [90, 90, 90]))
     flicker_black = disp_cfg.get("flicker_black", True)
     f_left, f_center, f_right = freqs_hz[0], freqs_hz[1], freqs_hz[2]
-    dt_left = 0.5 / f_left
-    dt_center = 0.5 / f_center
-    dt_right = 0.5 / f_right
+    flicker_states = _flicker_table([
+        _frames_per_half_period(refresh_rate_hz, f) for f in (f_left, f_center, f_right)
+    ])
+    flicker_period = len(flicker_states)
+    sq_surfaces = {
+        c: _make_square_surface(sq_size, c)
+        for c in {black, color_left, color_center, color_right, color_rest}
+    }
 
     fs = eeg_cfg["sampling_rate"]
     band_low = pre_cfg.get("bandpass_low_hz", 5.0)
@@ -211,6 +529,23 @@ def _run_calibration(
     cca_reg = stim_cfg.get("cca_reg", 1e-4)
     freq_tol = stim_cfg.get("frequency_tolerance_hz", 0.5)
     use_h2 = stim_cfg.get("use_second_harmonic", True)
+    fft_aggregate = stim_cfg.get("fft_aggregate", "power_mean")
+    # Detector specialized once for this configuration (filters, references)
+    detect = make_detector(
+        fs, freqs_hz,
+        method=method,
+        bandpass_low=band_low,
+        bandpass_high=band_high,
+        filter_order=filter_order,
+        car=car,
+        freq_tol_hz=freq_tol,
+        use_second_harmonic=use_h2,
+        cca_n_harmonics=cca_n_harmonics,
+        cca_components=cca_components,
+        cca_reg=cca_reg,
+        rest_threshold=None,
+        aggregate=fft_aggregate,
+    )
 
     phases = [
         ("LEFT", seconds_per_target),
@@ -219,43 +554,41 @@ def _run_calibration(
         ("REST (look at gray square)", rest_seconds),
     ]
     rest_max_scores: List[float] = []
+    min_new_samples = max(1, int(fs // 10))
+    last_analyzed = -min_new_samples
     cal_clock = pygame.time.Clock()
 
+    # Square rects depend only on window size; recomputed on resize only
+    layout_size: Optional[Tuple[int, int]] = None
+    layout: Tuple[pygame.Rect, ...] = ()
+
     def draw_calibration_squares(
-        w: int, h: int,
+        rects: Tuple[pygame.Rect, ...],
         state_l: int, state_c: int, state_r: int,
-    ) -> tuple:
-        cx, cy = w // 2, h // 2
-        r_left = pygame.Rect(cx - gap - sq_size, cy - sq_size // 2, sq_size, sq_size)
-        r_center = pygame.Rect(cx - sq_size // 2, cy - sq_size // 2, sq_size, sq_size)
-        r_right = pygame.Rect(cx + gap, cy - sq_size // 2, sq_size, sq_size)
-        r_rest = pygame.Rect(cx - sq_size // 2, cy + gap - sq_size // 2, sq_size, sq_size)
-        for rect, base_color, state in [
-            (r_left, color_left, state_l),
-            (r_center, color_center, state_c),
-            (r_right, color_right, state_r),
-        ]:
-            c = black if (state == 0 and flicker_black) else base_color
-            pygame.draw.rect(screen, c, rect)
-        pygame.draw.rect(screen, color_rest, r_rest)
+    ) -> None:
+        r_left, r_center, r_right, r_rest = rects
+        items = [
+            (sq_surfaces[black if (state == 0 and flicker_black) else base_color], rect.topleft)
+            for rect, base_color, state in (
+                (r_left, color_left, state_l),
+                (r_center, color_center, state_c),
+                (r_right, color_right, state_r),
+            )
+        ]
+        items.append((sq_surfaces[color_rest], r_rest.topleft))
+        _blit_batch(screen, items)
 
     for phase_name, duration in phases:
-        t_left, t_center, t_right = time.perf_counter(), time.perf_counter(), time.perf_counter()
-        state_left, state_center, state_right = 1, 1, 1
+        frame_count = 0
 
         t0 = time.perf_counter()
         while time.perf_counter() - t0 < duration:
             w, h = screen.get_size()
-            now = time.perf_counter()
-            if now - t_left >= dt_left:
-                t_left = now
-                state_left = 1 - state_left
-            if now - t_center >= dt_center:
-                t_center = now
-                state_center = 1 - state_center
-            if now - t_right >= dt_right:
-                t_right = now
-                state_right = 1 - state_right
+            if (w, h) != layout_size:
+                layout_size = (w, h)
+                layout = _square_layout(w, h, sq_size, gap)
+            state_left, state_center, state_right = flicker_states[frame_count % flicker_period]
+            frame_count += 1
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -264,33 +597,24 @@ def _run_calibration(
                     return None
 
             screen.fill(bg)
-            draw_calibration_squares(w, h, state_left, state_center, state_right)
-            title = font_m.render(f"Calibration: Look at {phase_name}", True, white)
+            draw_calibration_squares(layout, state_left, state_center, state_right)
+            title = render_cached(font_m, f"Calibration: Look at {phase_name}", white)
             tr = title.get_rect(center=(w // 2, 40))
             screen.blit(title, tr)
-            sub = font_l.render(f"({duration:.0f} s)  ESC = skip", True, gray)
+            sub = render_cached(font_l, f"({duration:.0f} s)  ESC = skip", gray)
             screen.blit(sub, (w // 2 - 80, h - 35))
             pygame.display.flip()
 
-            data, _ = stream.get_recent(window_sec)
-            if data is not None and data.shape[0] >= fs * 0.5:
-                _, scores = detect_ssvep_multi(
-                    data, fs, freqs_hz,
-                    bandpass_low=band_low,
-                    bandpass_high=band_high,
-                    filter_order=filter_order,
-                    car=car,
-                    freq_tol_hz=freq_tol,
-                    use_second_harmonic=use_h2,
-                    method=method,
-                    cca_n_harmonics=cca_n_harmonics,
-                    cca_components=cca_components,
-                    cca_reg=cca_reg,
-                    rest_threshold=None,
-                )
-                if phase_name.startswith("REST") and len(scores) > 0:
-                    rest_max_scores.append(max(scores))
-            cal_clock.tick(120)
+            # Re-run detection only once the window has advanced by min_new_samples
+            received = stream.samples_received
+            if received - last_analyzed >= min_new_samples:
+                data, _ = stream.get_recent(window_sec)
+                if data is not None and data.shape[0] >= fs * 0.5:
+                    last_analyzed = received
+                    _, scores = detect(data)
+                    if phase_name.startswith("REST") and len(scores) > 0:
+                        rest_max_scores.append(max(scores))
+            cal_clock.tick(refresh_rate_hz)
 
     if not rest_max_scores:
         return None
@@ -339,10 +663,10 @@ def main() -> None:
     flags = pygame.FULLSCREEN if disp_cfg.get("fullscreen") else 0
     flags |= pygame.RESIZABLE
     size = (disp_cfg.get("width", 1280), disp_cfg.get("height", 720))
-    screen = pygame.display.set_mode(size, flags)
+    screen = _set_display_mode(size, flags)
     pygame.display.set_caption("SSVEP Demo - Look at one square")
     clock = pygame.time.Clock()
-    refresh_rate_hz = disp_cfg.get("refresh_rate_hz")  # None = uncapped; set for flicker sync
+    refresh_rate_hz = _resolve_refresh_rate(disp_cfg)
 
     # User confirmation before starting signal quality check
     sig_cfg = config.get("signal_check", {})
@@ -356,18 +680,22 @@ def main() -> None:
 
     # Signal quality: collect data then show stats
     collect_sec = sig_cfg.get("collect_seconds", 2.5)
-    time.sleep(collect_sec)
+    if not _run_collect_screen(screen, collect_sec, disp_cfg):
+        stream.disconnect()
+        pygame.quit()
+        return
     data, ch_names = stream.get_recent(collect_sec)
     # Optionally filter before stats so values match BrainAccess Viewer (which shows filtered signal)
     if data is not None and sig_cfg.get("filter_before_stats", False):
-        # bandpass_filter expects time on last axis; data is (samples, channels)
+        # data is (samples, channels); filter along axis 0
         data = bandpass_filter(
-            data.T,
+            data,
             low_hz=pre_cfg.get("bandpass_low_hz", 5.0),
             high_hz=pre_cfg.get("bandpass_high_hz", 30.0),
             fs=eeg_cfg["sampling_rate"],
             order=pre_cfg.get("filter_order", 4),
-        ).T
+            axis=0,
+        )
     stats = compute_channel_stats(data, ch_names, snippet_len=10) if data is not None else []
     status_msg, ok_to_proceed = overall_status(stats)
     if not stats:
@@ -401,6 +729,7 @@ def main() -> None:
     detection_method = stim_cfg.get("detection_method", "fft")
     freq_tol = stim_cfg.get("frequency_tolerance_hz", 0.5)
     use_h2 = stim_cfg.get("use_second_harmonic", True)
+    fft_aggregate = stim_cfg.get("fft_aggregate", "power_mean")
     cca_n_harmonics = stim_cfg.get("cca_n_harmonics", 2)
     cca_components = stim_cfg.get("cca_components", 1)
     cca_reg = stim_cfg.get("cca_reg", 1e-4)
@@ -409,29 +738,26 @@ def main() -> None:
     band_high = pre_cfg.get("bandpass_high_hz", 30.0)
     filter_order = pre_cfg.get("filter_order", 4)
     car = pre_cfg.get("common_average_reference", True)
+    # Bandpass designed once; spectrum only applies it
+    band_sos = design_bandpass(band_low, band_high, fs, order=filter_order)
 
-    # Power chart: opened in separate window (F2); data written to CHART_DATA_PATH
+    # Power chart: F2 overlay, or separate window (F3) reading the shared-memory block
     chart_freq_min = disp_cfg.get("power_chart_freq_min", 5.0)
     chart_freq_max = disp_cfg.get("power_chart_freq_max", 16.0)
     chart_step_hz = disp_cfg.get("power_chart_step_hz", 0.5)
+    n_chart_bins = len(np.arange(chart_freq_min, chart_freq_max + chart_step_hz * 0.5, chart_step_hz))
+    chart_shm, chart_buffer = _open_chart_buffer(n_chart_bins)
 
     gap = 160
-    # Flicker: when refresh_rate_hz is set, flip by frame count for exact monitor sync
-    if refresh_rate_hz and refresh_rate_hz > 0:
-        frames_per_half_left = max(1, int(round(refresh_rate_hz / (2 * f_left))))
-        frames_per_half_center = max(1, int(round(refresh_rate_hz / (2 * f_center))))
-        frames_per_half_right = max(1, int(round(refresh_rate_hz / (2 * f_right))))
-    else:
-        frames_per_half_left = frames_per_half_center = frames_per_half_right = None
+    layout_size: Optional[Tuple[int, int]] = None
+    # Flicker: flip by frame count (vsync'd display) for exact monitor sync.
+    # States for left, center, right (rest is static) come from a per-period lookup table.
+    flicker_states = _flicker_table([
+        _frames_per_half_period(refresh_rate_hz, f) for f in (f_left, f_center, f_right)
+    ])
+    flicker_period = len(flicker_states)
     frame_count = 0
 
-    # Flicker state for left, center, right (rest is static)
-    t_left, t_center, t_right = 0.0, 0.0, 0.0
-    state_left, state_center, state_right = 1, 1, 1
-    dt_left = 0.5 / f_left
-    dt_center = 0.5 / f_center
-    dt_right = 0.5 / f_right
-
     # Calibration: rest threshold (max score below = classify as rest)
     rest_threshold: Optional[float] = None
     cal_cfg = config.get("calibration", {})
@@ -446,34 +772,87 @@ def main() -> None:
             pre_cfg=pre_cfg,
             stim_cfg=stim_cfg,
             eeg_cfg=eeg_cfg,
+            refresh_rate_hz=refresh_rate_hz,
         )
     # 4 classes: 0=left, 1=center, 2=right, 3=rest
-    history: list = []
-    smooth_count = 2
     n_classes = 4 if rest_enabled else 3
     chart_process: Optional[subprocess.Popen] = None
 
+    # Pre-render square surfaces (one per color) and static labels once;
+    # the render loop only blits them
+    sq_surfaces = {
+        c: _make_square_surface(sq_size, c)
+        for c in {black, color_left, color_center, color_right, color_rest, color_detected}
+    }
+    font = pygame.font.Font(None, 36)
+    label_color = (200, 200, 200)
+    lbl_left = font.render(f"{f_left} Hz", True, label_color).convert_alpha()
+    lbl_center = font.render(f"{f_center} Hz", True, label_color).convert_alpha()
+    lbl_right = font.render(f"{f_right} Hz", True, label_color).convert_alpha()
+    lbl_rest = font.render("REST", True, (160, 160, 160)).convert_alpha()
+    lbl_inst = font.render(
+        "Look at one square. ESC = quit.  F2 = Power chart  F3 = Chart window", True, (180, 180, 180)
+    ).convert_alpha()
+    font_s = pygame.font.Font(None, 22)
+    lbl_chart = font_s.render(
+        f"Power spectrum {chart_freq_min:g}-{chart_freq_max:g} Hz (F2 = hide)", True, (170, 170, 170)
+    ).convert_alpha()
+    show_chart = False
+
+    def square_color(base_color: tuple, state: int, is_detected: bool) -> tuple:
+        if state == 0 and flicker_black:
+            return black
+        if is_detected:
+            return color_detected
+        return base_color
+
+    # EEG analysis runs in a background thread; render loop only reads results
+    worker = AnalysisWorker(
+        stream,
+        make_detector(
+            fs, freqs_hz,
+            method=detection_method,
+            bandpass_low=band_low,
+            bandpass_high=band_high,
+            filter_order=filter_order,
+            car=car,
+            freq_tol_hz=freq_tol,
+            use_second_harmonic=use_h2,
+            cca_n_harmonics=cca_n_harmonics,
+            cca_components=cca_components,
+            cca_reg=cca_reg,
+            rest_threshold=rest_threshold if rest_enabled else None,
+            aggregate=fft_aggregate,
+        ),
+        window_sec=window_sec,
+        fs=fs,
+        spectrum_kwargs=dict(
+            freq_min_hz=chart_freq_min,
+            freq_max_hz=chart_freq_max,
+            step_hz=chart_step_hz,
+            bandpass_low=band_low,
+            bandpass_high=band_high,
+            filter_order=filter_order,
+            car=car,
+            sos=band_sos,
+            aggregate=fft_aggregate,
+        ),
+        n_classes=n_classes,
+        smooth_count=2,
+        chart_buffer=chart_buffer,
+        # fbCCA uses its own sub-band filters, so it cannot reuse the bandpassed window
+        preprocess_fn=None if detection_method == "fbcca" else functools.partial(
+            preprocess, fs=fs, car=car, sos=band_sos,
+            bandpass_low=band_low, bandpass_high=band_high, filter_order=filter_order,
+            bandpass=make_sos_filtfilt(band_sos) if band_sos is not None else None,
+        ),
+    )
+    worker.start()
+
     try:
         while True:
-            # Flicker: frame-based (sync to monitor) or time-based
-            if frames_per_half_left is not None:
-                if frame_count % frames_per_half_left == 0:
-                    state_left = 1 - state_left
-                if frame_count % frames_per_half_center == 0:
-                    state_center = 1 - state_center
-                if frame_count % frames_per_half_right == 0:
-                    state_right = 1 - state_right
-            else:
-                time_sec = pygame.time.get_ticks() / 1000.0
-                if time_sec - t_left >= dt_left:
-                    t_left = time_sec
-                    state_left = 1 - state_left
-                if time_sec - t_center >= dt_center:
-                    t_center = time_sec
-                    state_center = 1 - state_center
-                if time_sec - t_right >= dt_right:
-                    t_right = time_sec
-                    state_right = 1 - state_right
+            # Flicker: frame-based (sync to monitor)
+            state_left, state_center, state_right = flicker_states[frame_count % flicker_period]
             frame_count += 1
 
             for event in pygame.event.get():
@@ -483,104 +862,70 @@ def main() -> None:
                     if event.key == pygame.K_ESCAPE:
                         return
                     if event.key == pygame.K_F2:
+                        # Toggle in-process power chart overlay
+                        show_chart = not show_chart
+                    if event.key == pygame.K_F3:
                         # Open power chart in separate window
-                        if chart_process is None or chart_process.poll() is not None:
+                        if chart_shm is not None and (
+                            chart_process is None or chart_process.poll() is not None
+                        ):
                             try:
                                 chart_script = Path(__file__).parent / "chart_viewer.py"
                                 chart_process = subprocess.Popen(
-                                    [sys.executable, str(chart_script), str(CHART_DATA_PATH)],
+                                    [sys.executable, str(chart_script), chart_shm.name],
                                     cwd=str(Path(__file__).parent),
                                 )
                             except Exception:
                                 pass
                 if event.type == pygame.VIDEORESIZE:
-                    screen = pygame.display.set_mode((event.w, event.h), flags)
+                    screen = _set_display_mode((event.w, event.h), flags)
+            if show_chart or (chart_process is not None and chart_process.poll() is None):
+                worker.chart_enabled.set()
+            else:
+                worker.chart_enabled.clear()
 
-            # EEG analysis (3 targets + optional rest) + power spectrum for chart file
-            data, _ = stream.get_recent(window_sec)
-            freqs_plot = None
-            powers_plot = None
-            if data is not None and data.shape[0] >= fs * 0.5:
-                freqs_plot, powers_plot = compute_power_spectrum(
-                    data, fs,
-                    freq_min_hz=chart_freq_min,
-                    freq_max_hz=chart_freq_max,
-                    step_hz=chart_step_hz,
-                    bandpass_low=band_low,
-                    bandpass_high=band_high,
-                    filter_order=filter_order,
-                    car=car,
-                )
-                # Write to file for separate chart window (F2)
-                if freqs_plot is not None and powers_plot is not None:
-                    try:
-                        np.save(CHART_DATA_PATH, {"freqs": freqs_plot, "powers": powers_plot})
-                    except Exception:
-                        pass
-            detected_idx: Optional[int] = None
-            if data is not None and data.shape[0] >= fs * 0.5:
-                idx, _ = detect_ssvep_multi(
-                    data, fs, freqs_hz,
-                    bandpass_low=band_low,
-                    bandpass_high=band_high,
-                    filter_order=filter_order,
-                    car=car,
-                    freq_tol_hz=freq_tol,
-                    use_second_harmonic=use_h2,
-                    method=detection_method,
-                    cca_n_harmonics=cca_n_harmonics,
-                    cca_components=cca_components,
-                    cca_reg=cca_reg,
-                    rest_threshold=rest_threshold if rest_enabled else None,
-                )
-                # Map detector -1 (rest) -> 3 for history
-                hist_val = 3 if idx == -1 else idx
-                history.append(hist_val)
-                if len(history) > 25:
-                    history.pop(0)
-                detected_idx = get_smoothed_selection(
-                    history, min_agreements=smooth_count, n_classes=n_classes
-                )
+            # Latest analysis result from the background worker
+            with worker.lock:
+                result = worker.result
+            detected_idx: Optional[int] = result["detected_idx"]
 
-            # Draw (layout from current window size for resizability)
+            # Draw (layout from current window size for resizability; cached until resize)
             w, h = screen.get_size()
-            cx, cy = w // 2, h // 2
-            rect_left = pygame.Rect(cx - gap - sq_size, cy - sq_size // 2, sq_size, sq_size)
-            rect_center = pygame.Rect(cx - sq_size // 2, cy - sq_size // 2, sq_size, sq_size)
-            rect_right = pygame.Rect(cx + gap, cy - sq_size // 2, sq_size, sq_size)
-            rect_rest = pygame.Rect(cx - sq_size // 2, cy + gap - sq_size // 2, sq_size, sq_size)
+            if (w, h) != layout_size:
+                layout_size = (w, h)
+                rect_left, rect_center, rect_right, rect_rest = _square_layout(w, h, sq_size, gap)
 
             screen.fill(bg)
 
-            def draw_square(rect: pygame.Rect, base_color: tuple, state: int, is_detected: bool) -> None:
-                if state == 0 and flicker_black:
-                    c = black
-                elif is_detected:
-                    c = color_detected
-                else:
-                    c = base_color
-                pygame.draw.rect(screen, c, rect)
-
-            draw_square(rect_left, color_left, state_left, detected_idx == 0)
-            draw_square(rect_center, color_center, state_center, detected_idx == 1)
-            draw_square(rect_right, color_right, state_right, detected_idx == 2)
+            # Squares and labels in a single batched blit
+            items = [
+                (sq_surfaces[square_color(color_left, state_left, detected_idx == 0)], rect_left.topleft),
+                (sq_surfaces[square_color(color_center, state_center, detected_idx == 1)], rect_center.topleft),
+                (sq_surfaces[square_color(color_right, state_right, detected_idx == 2)], rect_right.topleft),
+                (lbl_left, (rect_left.centerx - 20, rect_left.bottom + 5)),
+                (lbl_center, (rect_center.centerx - 20, rect_center.bottom + 5)),
+                (lbl_right, (rect_right.centerx - 20, rect_right.bottom + 5)),
+                (lbl_inst, lbl_inst.get_rect(center=(w // 2, h - 28)).topleft),
+            ]
             if rest_enabled:
                 c_rest = color_detected if detected_idx == 3 else color_rest
-                pygame.draw.rect(screen, c_rest, rect_rest)
-
-            # Labels
-            font = pygame.font.Font(None, 36)
-            screen.blit(font.render(f"{f_left} Hz", True, (200, 200, 200)), (rect_left.centerx - 20, rect_left.bottom + 5))
-            screen.blit(font.render(f"{f_center} Hz", True, (200, 200, 200)), (rect_center.centerx - 20, rect_center.bottom + 5))
-            screen.blit(font.render(f"{f_right} Hz", True, (200, 200, 200)), (rect_right.centerx - 20, rect_right.bottom + 5))
-            if rest_enabled:
-                screen.blit(font.render("REST", True, (160, 160, 160)), (rect_rest.centerx - 25, rect_rest.bottom + 5))
-            inst = font.render("Look at one square. ESC = quit.  F2 = Power chart", True, (180, 180, 180))
-            screen.blit(inst, (w // 2 - 180, h - 40))
+                items.append((sq_surfaces[c_rest], rect_rest.topleft))
+                items.append((lbl_rest, (rect_rest.centerx - 25, rect_rest.bottom + 5)))
+            if result["error"]:
+                lbl_error = render_cached(font_s, f"Analysis error: {result['error'][:100]}", (255, 120, 120))
+                items.append((lbl_error, (20, h - 56)))
+            _blit_batch(screen, items)
+
+            if show_chart:
+                chart_rect = pygame.Rect(20, 30, w - 40, 130)
+                _draw_spectrum(screen, chart_rect, result["freqs"], result["powers"])
+                screen.blit(lbl_chart, (chart_rect.left + 6, chart_rect.top - 18))
 
             pygame.display.flip()
-            clock.tick(refresh_rate_hz if refresh_rate_hz and refresh_rate_hz > 0 else 120)
+            clock.tick(refresh_rate_hz)
     finally:
+        worker.stop()
+        worker.join(timeout=1.0)
         if chart_process is not None and chart_process.poll() is None:
             chart_process.terminate()
         stream.disconnect()
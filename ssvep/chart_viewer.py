@@ -1,11 +1,17 @@
 """
-Standalone power spectrum viewer. Reads freqs/powers from a file and updates a plot.
-Launched by the SSVEP app (e.g. on F2) so the chart runs in a separate window.
+Standalone power spectrum viewer. Reads freqs/powers from a SharedMemory block and updates a plot.
+Launched by the SSVEP app (F3) so the chart runs in a separate window:
+    python chart_viewer.py <shared_memory_name>
+
+Block layout (float64, written by app.py): [version, n, freqs[0:n], powers[0:n]].
+The version is odd while the app is writing; the plot is only redrawn when it
+changes to a new even value.
 """
 
+import os
 import sys
-import tempfile
-from pathlib import Path
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
 
 import numpy as np
 
@@ -17,11 +23,45 @@ try:
 except ImportError:
     plt = None  # type: ignore[assignment]
 
-DEFAULT_PATH = Path(tempfile.gettempdir()) / "ssvep_power.npy"
+
+def attach_chart_buffer(name: str) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """
+    Attach to the app's chart block without taking ownership (the app unlinks it).
+    Returns (shm, float64 view over the whole block).
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # Older Pythons register attached blocks too and would unlink it when the viewer exits.
+        # Only on POSIX, like SharedMemory's own register call (no resource tracker on Windows).
+        if os.name == "posix":
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    return shm, np.ndarray((shm.size // 8,), dtype=np.float64, buffer=shm.buf)
+
+
+def read_chart_buffer(
+    mm: np.ndarray, last_version: float
+) -> Optional[Tuple[float, np.ndarray, np.ndarray]]:
+    """
+    Return (version, freqs, powers) if a new consistent payload is available, else None.
+    """
+    version = float(mm[0])
+    if version == last_version or int(version) % 2 == 1:
+        return None
+    n = int(mm[1])
+    freqs = np.array(mm[2:2 + n])
+    powers = np.array(mm[2 + n:2 + 2 * n])
+    if float(mm[0]) != version:
+        return None  # writer updated while copying; retry next poll
+    return version, freqs, powers
 
 
 def main() -> None:
-    path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PATH
+    if len(sys.argv) < 2:
+        print("usage: python chart_viewer.py <shared_memory_name>")
+        sys.exit(2)
+    shm_name = sys.argv[1]
     if plt is None:
         print("matplotlib required for chart viewer: pip install matplotlib")
         sys.exit(1)
@@ -35,37 +75,63 @@ def main() -> None:
     ax.set_xlabel("Frequency (Hz)", color="#aaa")
     ax.set_ylabel("Power", color="#aaa")
     ax.set_title("Power spectrum (SSVEP)", color="#ccc")
-    line, = ax.plot([], [], color="#50b4dc", linewidth=1.5)
+    line, = ax.plot([], [], color="#50b4dc", linewidth=1.5, animated=True)
     ax.set_ylim(0, 1)
     if fig.canvas.manager is not None:
         getattr(fig.canvas.manager, "set_window_title", lambda _: None)("SSVEP Power")
     plt.ion()
     plt.show(block=False)
+    canvas = fig.canvas
+    # Full draw only when axes limits change; otherwise blit the line over a cached background.
+    background = {"bbox": None}
+
+    def _on_draw(_event) -> None:
+        # Re-cache after any full draw (including window resize) and repaint the animated line
+        background["bbox"] = canvas.copy_from_bbox(ax.bbox)
+        ax.draw_artist(line)
+
+    canvas.mpl_connect("draw_event", _on_draw)
+    canvas.draw()
+    y_top = 1.0
+    x_lim: Tuple[float, float] = (0.0, 0.0)
+    shm: Optional[shared_memory.SharedMemory] = None
+    mm: Optional[np.ndarray] = None
+    last_version = 0.0
     try:
         while plt.get_fignums():
             try:
-                if path.exists():
-                    data = np.load(path, allow_pickle=True)
-                    if isinstance(data, np.ndarray) and data.shape == ():
-                        data = data.item()
-                    if isinstance(data, dict) and "freqs" in data and "powers" in data:
-                        freqs = np.asarray(data["freqs"])
-                        powers = np.asarray(data["powers"])
-                        if len(freqs) and len(powers):
-                            line.set_data(freqs, powers)
-                            ax.set_xlim(float(freqs[0]), float(freqs[-1]))
-                            p_max = float(np.max(powers)) or 1e-12
-                            ax.set_ylim(0, p_max * 1.05)
-                            ax.figure.canvas.draw_idle()
+                if mm is None:
+                    shm, mm = attach_chart_buffer(shm_name)
+                update = read_chart_buffer(mm, last_version) if mm is not None else None
+                if update is not None:
+                    last_version, freqs, powers = update
+                    if len(freqs) and len(powers):
+                        line.set_data(freqs, powers)
+                        p_max = float(np.max(powers)) or 1e-12
+                        new_x_lim = (float(freqs[0]), float(freqs[-1]))
+                        if new_x_lim != x_lim or abs(p_max * 1.05 - y_top) > 0.1 * y_top:
+                            x_lim = new_x_lim
+                            y_top = p_max * 1.05
+                            ax.set_xlim(*x_lim)
+                            ax.set_ylim(0, y_top)
+                            canvas.draw()
+                        else:
+                            canvas.restore_region(background["bbox"])
+                            ax.draw_artist(line)
+                        canvas.blit(ax.bbox)
             except Exception:
                 pass
-            plt.pause(0.2)
+            # Wait for the next poll while still servicing GUI events (move/resize/close)
+            canvas.start_event_loop(0.2)
     except Exception:
         pass
     try:
         plt.close(fig)
     except Exception:
         pass
+    if shm is not None:
+        mm = None
+        shm.close()
 
 
 if __name__ == "__main__":
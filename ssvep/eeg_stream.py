@@ -5,14 +5,20 @@ Loads channels and channel_mapping from config; buffers recent samples
 for real-time SSVEP analysis. Standalone (no dependency on session package).
 """
 
+import copy
+import threading
 import time
-from collections import deque
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader  # libyaml-backed parser
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 try:
     from brainaccess.core.eeg_manager import EEGManager
     from brainaccess.core import scan as ba_scan
@@ -32,16 +38,28 @@ DEFAULT_CHANNEL_MAPPING = {
 }
 
 
+# Parsed configs keyed by (resolved path, mtime_ns); an edited file gets a new key
+_CONFIG_CACHE: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+
 def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
-    """Load SSVEP config YAML. Returns full config dict."""
+    """
+    Load SSVEP config YAML. Returns full config dict.
+    Parsed once per file version; callers get their own (deep) copy.
+    """
     path: Path = (
         Path(config_path) if config_path is not None
         else Path(__file__).parent / "config.yaml"
     )
     if not path.exists():
         raise FileNotFoundError(f"Config not found: {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    key = (str(path.resolve()), path.stat().st_mtime_ns)
+    config = _CONFIG_CACHE.get(key)
+    if config is None:
+        with open(path, "rb") as f:
+            config = yaml.load(f, Loader=_YamlLoader)
+        _CONFIG_CACHE[key] = config
+    return copy.deepcopy(config)
 
 
 class EEGStream:
@@ -63,9 +81,18 @@ class EEGStream:
         self._mapping = channel_mapping or DEFAULT_CHANNEL_MAPPING
         self.channel_mapping: Dict[str, int] = {}
         self.chunk_index_map: Dict[str, int] = {}
+        # Chunk array index per entry of self.channels (-1 = not available)
+        self._ch_idx = np.full(len(self.channels), -1, dtype=np.intp)
         max_samples = sampling_rate * buffer_seconds
-        self._data: deque = deque(maxlen=max_samples)
-        self._timestamps: deque = deque(maxlen=max_samples)
+        # Preallocated ring buffer: rows = samples, columns = self.channels.
+        # _head is the next write row; _filled counts valid rows (<= max_samples).
+        self._max_samples = max_samples
+        self._buf = np.zeros((max_samples, len(self.channels)), dtype=np.float32)
+        self._ts = np.zeros(max_samples, dtype=np.float64)
+        self._head = 0
+        self._filled = 0
+        self._lock = threading.Lock()  # SDK callback thread writes, analysis thread reads
+        self._samples_received = 0
         self._eeg_manager: Optional[EEGManager] = None
         self._core_initialized = False
         self.is_connected = False
@@ -143,36 +170,64 @@ class EEGStream:
                     self.chunk_index_map[ch] = self._eeg_manager.get_channel_index(addr)
                 except Exception:
                     pass
+        self._ch_idx = np.array(
+            [self.chunk_index_map.get(ch, -1) for ch in self.channels], dtype=np.intp
+        )
 
     def _on_chunk(self, chunk_arrays, chunk_size: int) -> None:
         base_t = time.time()
         dt = 1.0 / self.sampling_rate
-        for i in range(chunk_size):
-            t = base_t + i * dt
-            row = []
-            for ch in self.channels:
-                ci = self.chunk_index_map.get(ch, -1)
-                if 0 <= ci < len(chunk_arrays) and i < len(chunk_arrays[ci]):
-                    row.append(chunk_arrays[ci][i])
-                else:
-                    row.append(0.0)
-            self._data.append(row)
-            self._timestamps.append(t)
+        # One column copy per channel; missing channels / short arrays stay zero
+        block = np.zeros((chunk_size, len(self.channels)), dtype=np.float32)
+        for k, ci in enumerate(self._ch_idx):
+            if 0 <= ci < len(chunk_arrays):
+                col = np.asarray(chunk_arrays[ci])[:chunk_size]
+                block[:len(col), k] = col
+        timestamps = base_t + np.arange(chunk_size) * dt
+        self._append(block, timestamps)
+
+    def _append(self, block: np.ndarray, timestamps: np.ndarray) -> None:
+        """Copy a (n, n_channels) block into the ring buffer, wrapping around at the end."""
+        received = n = block.shape[0]
+        if n == 0:
+            return
+        size = self._max_samples
+        if n > size:  # chunk longer than the buffer: keep only its tail
+            block, timestamps = block[-size:], timestamps[-size:]
+            n = size
+        with self._lock:
+            first = min(n, size - self._head)
+            self._buf[self._head:self._head + first] = block[:first]
+            self._ts[self._head:self._head + first] = timestamps[:first]
+            if first < n:
+                self._buf[:n - first] = block[first:]
+                self._ts[:n - first] = timestamps[first:]
+            self._head = (self._head + n) % size
+            self._filled = min(self._filled + n, size)
+            self._samples_received += received
+
+    @property
+    def samples_received(self) -> int:
+        """Total samples appended since creation (monotonic; not capped by the buffer)."""
+        return self._samples_received
 
     def get_recent(self, seconds: float) -> Tuple[Optional[np.ndarray], List[str]]:
         """
         Return (samples, channels) for last `seconds` of data.
-        Shape: (n_samples, n_channels), channel order = self.channels.
+        Shape: (n_samples, n_channels), channel order = self.channels, dtype float32 (a copy).
         If raw_to_uv_scale != 1.0, values are converted to microvolts (µV).
         """
-        if not self._data:
-            return None, self.channels
-        n = min(int(seconds * self.sampling_rate), len(self._data))
-        if n <= 0:
-            return None, self.channels
-        arr = np.array(list(self._data)[-n:], dtype=float)
+        with self._lock:
+            n = min(int(seconds * self.sampling_rate), self._filled)
+            if n <= 0:
+                return None, self.channels
+            start = self._head - n
+            if start >= 0:
+                arr = self._buf[start:self._head].copy()
+            else:  # window wraps: older part at the end of the ring, newer at the start
+                arr = np.concatenate((self._buf[start:], self._buf[:self._head]))
         if self.raw_to_uv_scale != 1.0:
-            arr = arr * self.raw_to_uv_scale
+            arr *= np.float32(self.raw_to_uv_scale)
         return arr, list(self.channels)
 
     def disconnect(self) -> None:
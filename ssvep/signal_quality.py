@@ -38,6 +38,25 @@ def assess_quality(std_val: float, ptp_val: float, max_abs: float) -> str:
     return "good"
 
 
+def assess_quality_array(
+    std_vals: np.ndarray,
+    ptp_vals: np.ndarray,
+    max_abs: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorized assess_quality over channels (same thresholds and precedence).
+
+    Returns
+    -------
+    np.ndarray
+        Array of "good" / "fair" / "poor" labels, one per channel.
+    """
+    flat = (std_vals < STD_MIN) | (ptp_vals < PTP_MIN)
+    artifact = (std_vals > STD_HIGH_ARTIFACT) | (ptp_vals > PTP_SATURATION) | (max_abs > ABS_CLIP_WARN)
+    fair = (std_vals > STD_FAIR) | (ptp_vals > PTP_FAIR)
+    return np.select([flat | artifact, fair], ["poor", "fair"], default="good")
+
+
 def compute_channel_stats(
     data: np.ndarray,
     channel_names: List[str],
@@ -62,21 +81,21 @@ def compute_channel_stats(
     """
     if data is None or data.size == 0:
         return []
-    n_ch = data.shape[1]
-    results = []
-    for c in range(min(n_ch, len(channel_names))):
-        ch_name = channel_names[c] if c < len(channel_names) else f"Ch{c}"
-        col = data[:, c]
-        mean_val = float(np.mean(col))
-        std_val = float(np.std(col))
-        min_val = float(np.min(col))
-        max_val = float(np.max(col))
-        ptp_val = float(np.ptp(col))
-        max_abs = float(np.max(np.abs(col)))
-        quality = assess_quality(std_val, ptp_val, max_abs)
-        snippet = col[-snippet_len:].tolist() if len(col) >= snippet_len else col.tolist()
-        results.append({
-            "name": ch_name,
+    n_ch = min(data.shape[1], len(channel_names))
+    # Stats in float64: the EEG window is float32 and raw counts can carry a large offset
+    block = np.asarray(data[:, :n_ch], dtype=np.float64)
+    # All channels at once: one axis-0 reduction per statistic
+    mean_vals = block.mean(axis=0)
+    std_vals = block.std(axis=0)
+    min_vals = block.min(axis=0)
+    max_vals = block.max(axis=0)
+    ptp_vals = max_vals - min_vals
+    max_abs = np.maximum(np.abs(min_vals), np.abs(max_vals))
+    qualities = assess_quality_array(std_vals, ptp_vals, max_abs)
+    snippets = block[-snippet_len:].T.tolist()
+    return [
+        {
+            "name": name,
             "mean": mean_val,
             "std": std_val,
             "min": min_val,
@@ -84,8 +103,18 @@ def compute_channel_stats(
             "ptp": ptp_val,
             "quality": quality,
             "snippet": snippet,
-        })
-    return results
+        }
+        for name, mean_val, std_val, min_val, max_val, ptp_val, quality, snippet in zip(
+            channel_names[:n_ch],
+            mean_vals.tolist(),
+            std_vals.tolist(),
+            min_vals.tolist(),
+            max_vals.tolist(),
+            ptp_vals.tolist(),
+            qualities.tolist(),
+            snippets,
+        )
+    ]
 
 
 def overall_status(stats: List[Dict[str, Any]]) -> Tuple[str, bool]:
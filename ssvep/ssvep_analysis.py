@@ -2,36 +2,127 @@
 SSVEP frequency detection from short EEG windows.
 
 Preprocessing: bandpass filter, optional common-average reference.
-Detection: FFT power or CCA (Canonical Correlation Analysis) at stimulus
-frequencies; returns which target frequency dominates for feedback.
+Detection: FFT power, CCA (Canonical Correlation Analysis) or filter-bank CCA
+at stimulus frequencies; returns which target frequency dominates for feedback.
 Supports N targets and optional rest state (no dominant frequency).
 """
 
-from typing import List, Optional, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 from scipy import signal as scipy_signal
-from scipy.linalg import sqrtm
+from scipy.fft import next_fast_len, rfft, rfftfreq
+from scipy.linalg import cholesky, solve_triangular
 
 
-def bandpass_filter(
-    data: np.ndarray,
+# Designed Butterworth SOS keyed by (order, low, high) in normalized frequency; shared, do not modify
+_SOS_CACHE: Dict[Tuple[int, float, float], np.ndarray] = {}
+
+# fbCCA sub-bands (Hz): common high edge, low edge stepping up past the fundamentals
+FBCCA_SUBBANDS_HZ: Tuple[Tuple[float, float], ...] = ((6.0, 50.0), (14.0, 50.0), (22.0, 50.0))
+
+
+def design_bandpass(
     low_hz: float,
     high_hz: float,
     fs: float,
     order: int = 4,
-) -> np.ndarray:
+) -> Optional[np.ndarray]:
     """
-    Apply zero-phase bandpass Butterworth along last axis (time).
-    `data` shape: (..., n_times).
+    Design a Butterworth bandpass as second-order sections (SOS).
+    Returns None if the band is empty after clipping to (0, Nyquist).
+    Designs are memoized, so calls without a precomputed `sos` do not redesign the filter.
     """
     nyq = 0.5 * fs
     low = max(0.01, low_hz / nyq)
     high = min(0.99, high_hz / nyq)
     if low >= high:
-        return data
-    b, a = scipy_signal.butter(order, [low, high], btype="band")
-    return scipy_signal.filtfilt(b, a, data, axis=-1)
+        return None
+    key = (int(order), round(low, 6), round(high, 6))
+    sos = _SOS_CACHE.get(key)
+    if sos is None:
+        # Left writable: scipy's compiled sosfilt rejects read-only buffers. Callers must not modify it.
+        sos = scipy_signal.butter(order, [low, high], btype="band", output="sos")
+        _SOS_CACHE[key] = sos
+    return sos
+
+
+def design_filter_bank(
+    fs: float,
+    bands_hz: Sequence[Tuple[float, float]] = FBCCA_SUBBANDS_HZ,
+    order: int = 4,
+) -> List[np.ndarray]:
+    """SOS bandpass per fbCCA sub-band (empty bands are dropped)."""
+    bank = [design_bandpass(lo, hi, fs, order=order) for lo, hi in bands_hz]
+    return [sos for sos in bank if sos is not None]
+
+
+def fbcca_weights(n_bands: int, a: float = 1.25, b: float = 0.25) -> np.ndarray:
+    """Sub-band weights w_k = k^-a + b (k = 1..n_bands), as in Chen et al. fbCCA."""
+    k = np.arange(1, n_bands + 1, dtype=float)
+    return k ** -a + b
+
+
+def bandpass_filter(
+    data: np.ndarray,
+    low_hz: float,
+    high_hz: float,
+    fs: float,
+    order: int = 4,
+    sos: Optional[np.ndarray] = None,
+    axis: int = -1,
+) -> np.ndarray:
+    """
+    Apply zero-phase bandpass Butterworth along `axis` (time; default last axis).
+    Use axis=0 for (n_samples, n_channels) data instead of transposing. If `sos` is
+    given (see design_bandpass), it is used as-is and low_hz/high_hz/order are ignored.
+    Output keeps the dtype of floating-point input (e.g. float32).
+    """
+    if sos is None:
+        sos = design_bandpass(low_hz, high_hz, fs, order=order)
+        if sos is None:
+            return data
+    return _sosfiltfilt_keep_dtype(sos, data, axis=axis)
+
+
+def _sosfiltfilt_keep_dtype(sos: np.ndarray, data: np.ndarray, axis: int = -1) -> np.ndarray:
+    """sosfiltfilt with float64 coefficients (IIR stability), cast back to float input dtype."""
+    filtered = scipy_signal.sosfiltfilt(sos, data, axis=axis)
+    if data.dtype.kind == "f":
+        return filtered.astype(data.dtype, copy=False)
+    return filtered
+
+
+def make_sos_filtfilt(sos: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Zero-phase SOS filter along axis 0 specialized for fixed coefficients.
+
+    Equivalent to sosfiltfilt(sos, x, axis=0) (odd padding, steady-state initial
+    conditions), but the pad length and sosfilt_zi are derived once here instead of
+    on every call. Output keeps the dtype of floating-point input.
+    """
+    sos = np.array(sos, dtype=np.float64)  # writable copy owned by the closure
+    n_sections = sos.shape[0]
+    n_taps = 2 * n_sections + 1 - min(int((sos[:, 2] == 0).sum()), int((sos[:, 5] == 0).sum()))
+    padlen = 3 * n_taps
+    zi = scipy_signal.sosfilt_zi(sos)[:, :, None]  # (n_sections, 2, 1), scaled per channel
+
+    def apply(x: np.ndarray) -> np.ndarray:
+        if x.shape[0] <= padlen:
+            return _sosfiltfilt_keep_dtype(sos, x, axis=0)  # let scipy report the short input
+        ext = np.concatenate(
+            (2 * x[:1] - x[padlen:0:-1], x, 2 * x[-1:] - x[-2:-padlen - 2:-1]), axis=0
+        )
+        y, _ = scipy_signal.sosfilt(sos, ext, axis=0, zi=zi * ext[0])
+        y = y[::-1]
+        y, _ = scipy_signal.sosfilt(sos, y, axis=0, zi=zi * y[0])
+        y = y[::-1][padlen:-padlen]
+        if x.dtype.kind == "f":
+            return y.astype(x.dtype, copy=False)
+        return y
+
+    return apply
 
 
 def common_average_reference(data: np.ndarray, axis: int = -2) -> np.ndarray:
@@ -40,6 +131,33 @@ def common_average_reference(data: np.ndarray, axis: int = -2) -> np.ndarray:
     return data - mean
 
 
+def preprocess(
+    data: np.ndarray,
+    fs: float,
+    bandpass_low: float = 5.0,
+    bandpass_high: float = 30.0,
+    filter_order: int = 4,
+    car: bool = True,
+    sos: Optional[np.ndarray] = None,
+    bandpass: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Bandpass along time (axis 0) then optional CAR; `data` shape (n_samples, n_channels).
+    Shared by the detectors and compute_power_spectrum so a window filtered once can be
+    passed to both (see their `preprocessed` / `filtered` arguments). `bandpass` is an
+    optional specialized filter (make_sos_filtfilt) used instead of bandpass_filter.
+    """
+    if bandpass is not None:
+        filtered = bandpass(data)
+    else:
+        filtered = bandpass_filter(
+            data, low_hz=bandpass_low, high_hz=bandpass_high, fs=fs, order=filter_order, sos=sos, axis=0
+        )
+    if car and filtered.shape[1] > 1:
+        filtered = common_average_reference(filtered, axis=1)
+    return filtered
+
+
 def power_at_frequency(
     sig: np.ndarray,
     fs: float,
@@ -54,13 +172,17 @@ def power_at_frequency(
     n = sig.shape[-1]
     if n == 0:
         return 0.0
-    fft_vals = np.fft.rfft(sig, axis=-1)
-    freqs = np.fft.rfftfreq(n, 1.0 / fs)
-    power = np.abs(fft_vals) ** 2
+    # Zero-pad to a fast FFT length (no-op for usual 5-smooth windows, e.g. 750 = 3 s @ 250 Hz)
+    n_fft = next_fast_len(n, real=True)
+    fft_vals = rfft(sig, n=n_fft, axis=-1, workers=-1)
+    freqs = rfftfreq(n_fft, 1.0 / fs)
+    power = fft_vals.real ** 2 + fft_vals.imag ** 2
 
     def band_power(f_target: float) -> float:
-        mask = (freqs >= f_target - tol_hz) & (freqs <= f_target + tol_hz)
-        return float(np.sum(power[..., mask]))
+        # Bins with f_target - tol <= f <= f_target + tol: contiguous slice of the sorted bins
+        lo = np.searchsorted(freqs, f_target - tol_hz, side="left")
+        hi = np.searchsorted(freqs, f_target + tol_hz, side="right")
+        return float(np.sum(power[..., lo:hi]))
 
     p = band_power(freq_hz)
     if use_second_harmonic:
@@ -68,6 +190,66 @@ def power_at_frequency(
     return p
 
 
+def _fft_band_edges(
+    n: int,
+    fs: float,
+    freqs_hz: Sequence[float],
+    tol_hz: float = 0.5,
+    use_second_harmonic: bool = True,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    rFFT bin ranges [lo, hi) of each target band for an n-sample window (FFT length
+    next_fast_len(n)), shape (1 or 2 harmonics, n_targets). Found by searchsorted on the
+    (sorted) bin frequencies, same bins as power_at_frequency.
+    """
+    targets = np.asarray(freqs_hz, dtype=float)
+    centers = np.stack([targets, 2.0 * targets]) if use_second_harmonic else targets[None, :]
+    freqs = rfftfreq(next_fast_len(n, real=True), 1.0 / fs)
+    lo = np.searchsorted(freqs, centers - tol_hz, side="left")
+    hi = np.searchsorted(freqs, centers + tol_hz, side="right")
+    return lo, hi
+
+
+def _target_powers(
+    sig: np.ndarray,
+    fs: float,
+    freqs_hz: Sequence[float],
+    tol_hz: float = 0.5,
+    use_second_harmonic: bool = True,
+    edges: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    power_at_frequency for several target frequencies from a single rFFT call.
+    `sig` is 1D, or (n_samples, n_channels): then each channel is transformed and the
+    power spectra are averaged across channels. `edges` are precomputed _fft_band_edges
+    for this window length (computed if omitted).
+    """
+    n = sig.shape[0]
+    if n == 0:
+        return np.zeros(len(freqs_hz))
+    if edges is None:
+        edges = _fft_band_edges(n, fs, freqs_hz, tol_hz, use_second_harmonic)
+    lo, hi = edges
+    fft_vals = rfft(sig, n=next_fast_len(n, real=True), axis=0, workers=-1)
+    power = (fft_vals.real ** 2 + fft_vals.imag ** 2).astype(np.float64, copy=False)
+    if power.ndim == 2:
+        power = power.mean(axis=1)
+    # Band sum = difference of two prefix sums; harmonics summed per target
+    csum = np.concatenate(([0.0], np.cumsum(power)))
+    return (csum[hi] - csum[lo]).sum(axis=0)
+
+
+def _fft_input(filtered: np.ndarray, aggregate: str) -> np.ndarray:
+    """
+    Signal handed to _target_powers: the preprocessed (n_samples, n_channels) window for
+    aggregate="power_mean" (per-channel FFT, mean power), else its channel mean ("mean").
+    After CAR the channel mean is identically zero, so "mean" is only useful with car off.
+    """
+    if aggregate == "power_mean" or filtered.ndim == 1:
+        return filtered
+    return np.mean(filtered, axis=1)
+
+
 def compute_power_spectrum(
     data: np.ndarray,
     fs: float,
@@ -79,26 +261,26 @@ def compute_power_spectrum(
     filter_order: int = 4,
     car: bool = True,
     tol_hz: float = 0.25,
+    sos: Optional[np.ndarray] = None,
+    preprocessed: bool = False,
+    aggregate: str = "power_mean",
 ) -> Tuple[np.ndarray, np.ndarray]:
     """
     Compute power at frequencies from freq_min_hz to freq_max_hz with step_hz.
     Uses same preprocessing as detection (bandpass, optional CAR). Returns
-    (freqs, powers) for plotting; power is from averaged channels, no second harmonic.
+    (freqs, powers) for plotting; channels are combined per `aggregate` (see
+    detect_ssvep_multi), no second harmonic. If `preprocessed` is True, `data` is
+    already the output of preprocess() and is used as-is.
     """
     if data is None or data.size == 0:
         freqs = np.arange(freq_min_hz, freq_max_hz + step_hz * 0.5, step_hz)
         return freqs, np.zeros_like(freqs)
-    filtered = bandpass_filter(
-        data.T, low_hz=bandpass_low, high_hz=bandpass_high, fs=fs, order=filter_order
-    ).T
-    if car and filtered.shape[1] > 1:
-        filtered = common_average_reference(filtered, axis=1)
-    ch_series = np.mean(filtered, axis=1)
+    if preprocessed:
+        filtered = data
+    else:
+        filtered = preprocess(data, fs, bandpass_low, bandpass_high, filter_order, car, sos=sos)
     freqs = np.arange(freq_min_hz, freq_max_hz + step_hz * 0.5, step_hz)
-    powers = np.array([
-        power_at_frequency(ch_series, fs, f, tol_hz=tol_hz, use_second_harmonic=False)
-        for f in freqs
-    ])
+    powers = _target_powers(_fft_input(filtered, aggregate), fs, freqs, tol_hz=tol_hz, use_second_harmonic=False)
     return freqs, powers
 
 
@@ -117,6 +299,8 @@ def detect_ssvep(
     cca_n_harmonics: int = 2,
     cca_components: int = 1,
     cca_reg: float = 1e-4,
+    sos: Optional[np.ndarray] = None,
+    aggregate: str = "power_mean",
 ) -> Tuple[int, float, float]:
     """
     Run preprocessing and return which target (0 = left, 1 = right) and raw scores.
@@ -147,6 +331,11 @@ def detect_ssvep(
         Sum of first N canonical correlations as score (method "cca").
     cca_reg : float
         Regularization for CCA covariance matrices (method "cca").
+    sos : np.ndarray, optional
+        Precomputed bandpass (design_bandpass); overrides bandpass_low/high and filter_order.
+    aggregate : str
+        How channels enter the FFT (FFT method only): "power_mean" = per-channel power
+        spectra averaged; "mean" = FFT of the channel mean (zero after CAR).
 
     Returns
     -------
@@ -165,24 +354,15 @@ def detect_ssvep(
             n_harmonics=cca_n_harmonics,
             cca_components=cca_components,
             cca_reg=cca_reg,
+            sos=sos,
         )
-    # FFT method (bandpass_filter expects time on last axis; data is (samples, channels))
-    filtered = bandpass_filter(
-        data.T, low_hz=bandpass_low, high_hz=bandpass_high, fs=fs, order=filter_order
-    ).T
-    if car and filtered.shape[1] > 1:
-        filtered = common_average_reference(filtered, axis=1)
-    ch_series = np.mean(filtered, axis=1)
-    p_left = power_at_frequency(
-        ch_series, fs, freq_left_hz,
+    # FFT method (data is (samples, channels); filter along axis 0)
+    filtered = preprocess(data, fs, bandpass_low, bandpass_high, filter_order, car, sos=sos)
+    p_left, p_right = _target_powers(
+        _fft_input(filtered, aggregate), fs, (freq_left_hz, freq_right_hz),
         tol_hz=freq_tol_hz,
         use_second_harmonic=use_second_harmonic,
-    )
-    p_right = power_at_frequency(
-        ch_series, fs, freq_right_hz,
-        tol_hz=freq_tol_hz,
-        use_second_harmonic=use_second_harmonic,
-    )
+    ).tolist()
     selected = 1 if p_right > p_left else 0
     return selected, p_left, p_right
 
@@ -193,14 +373,68 @@ def _build_cca_reference(
     freq_hz: float,
     n_harmonics: int = 2,
 ) -> np.ndarray:
-    """Build reference matrix Y: [sin(f*t), cos(f*t), sin(2f*t), cos(2f*t), ...]. Shape (n_samples, 2*n_harmonics)."""
+    """
+    Build reference matrix Y: [sin(f*t), cos(f*t), sin(2f*t), cos(2f*t), ...].
+    Shape (n_samples, 2*n_harmonics), float64 like the rest of the CCA algebra.
+    """
     t = np.arange(n_samples, dtype=float) / fs
-    cols = []
-    for h in range(1, n_harmonics + 1):
-        f = h * freq_hz
-        cols.append(np.sin(2 * np.pi * f * t))
-        cols.append(np.cos(2 * np.pi * f * t))
-    return np.column_stack(cols)
+    harmonics = np.arange(1, n_harmonics + 1, dtype=float)
+    # All harmonics at once: phase[:, k] = 2*pi*(k+1)*f*t; sin/cos interleaved by column
+    phase = (2 * np.pi * freq_hz) * np.outer(t, harmonics)
+    Y = np.empty((n_samples, 2 * n_harmonics))
+    np.sin(phase, out=Y[:, 0::2])
+    np.cos(phase, out=Y[:, 1::2])
+    return Y
+
+
+def _cca_y_side(Y: np.ndarray, reg: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Centered Y and the Cholesky factor of its regularized covariance (None if not positive definite)."""
+    n = Y.shape[0]
+    Yc = Y - np.mean(Y, axis=0)
+    Cyy = (Yc.T @ Yc) / n + reg * np.eye(Yc.shape[1])
+    try:
+        Ly = cholesky(Cyy, lower=True)
+    except (np.linalg.LinAlgError, ValueError):
+        Ly = None
+    return Yc, Ly
+
+
+@lru_cache(maxsize=64)
+def _cca_reference_cached(
+    n_samples: int,
+    fs: float,
+    freq_hz: float,
+    n_harmonics: int,
+    reg: float,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Y-side of the CCA for one target: (centered reference, Cholesky factor of Cyy).
+    Memoized: window length, fs, frequencies and harmonics are fixed during a session,
+    so only the EEG side is recomputed per detection call. Read-only.
+    """
+    Yc, Ly = _cca_y_side(_build_cca_reference(n_samples, fs, freq_hz, n_harmonics=n_harmonics), reg)
+    Yc.setflags(write=False)
+    if Ly is not None:
+        Ly.setflags(write=False)
+    return Yc, Ly
+
+
+@lru_cache(maxsize=16)
+def _cca_reference_stack(
+    n_samples: int,
+    fs: float,
+    freqs_hz: Tuple[float, ...],
+    n_harmonics: int,
+    reg: float,
+) -> Tuple[np.ndarray, Tuple[Optional[np.ndarray], ...]]:
+    """
+    Centered references of all targets stacked column-wise (n_samples, n_targets * 2*n_harmonics)
+    plus each target's Cholesky factor, so X^T Y is one matrix product per window. Read-only.
+    """
+    sides = [_cca_reference_cached(n_samples, fs, f, n_harmonics, reg) for f in freqs_hz]
+    Y_all = np.concatenate([Yc for Yc, _ in sides], axis=1)
+    Y_all.setflags(write=False)
+    return Y_all, tuple(Ly for _, Ly in sides)
 
 
 def _cca_correlation(X: np.ndarray, Y: np.ndarray, reg: float = 1e-4) -> np.ndarray:
@@ -208,23 +442,49 @@ def _cca_correlation(X: np.ndarray, Y: np.ndarray, reg: float = 1e-4) -> np.ndar
     Canonical correlations between X (n_samples, n_x) and Y (n_samples, n_y).
     Returns array of min(n_x, n_y) canonical correlations (sorted descending).
     """
+    Yc, Ly = _cca_y_side(Y, reg)
+    return _cca_correlations_batched(X, Yc, (Ly,), reg=reg)[0]
+
+
+def _cca_correlations_batched(
+    X: np.ndarray,
+    Y_all: np.ndarray,
+    Lys: Sequence[Optional[np.ndarray]],
+    reg: float = 1e-4,
+) -> List[np.ndarray]:
+    """
+    Canonical correlations of X with each of len(Lys) centered references stacked
+    column-wise (equal widths) in Y_all, given their Cholesky factors. The X side
+    (centering, Cxx factorization, X^T Y and the Lx solve) runs once for all targets.
+    Runs in float64 for float32 windows too: after CAR, Cxx is rank-deficient and a
+    small `reg` is below float32 rounding of its entries, so Cholesky would fail.
+    """
+    n_targets = len(Lys)
     n = X.shape[0]
-    X = X - np.mean(X, axis=0)
-    Y = Y - np.mean(Y, axis=0)
-    Cxx = (X.T @ X) / n + reg * np.eye(X.shape[1])
-    Cyy = (Y.T @ Y) / n + reg * np.eye(Y.shape[1])
-    Cxy = (X.T @ Y) / n
+    X = X.astype(np.float64)
+    X -= np.mean(X, axis=0)
+    Cxx = X.T @ X
+    Cxx /= n
+    Cxx.flat[::Cxx.shape[0] + 1] += reg  # ridge on the diagonal without an eye() temporary
+    # Whiten with Cholesky factors (Cxx = Lx Lx^T): singular values of
+    # Lx^-1 Cxy Ly^-T are the canonical correlations; no sqrtm/inv needed.
     try:
-        Cxx_sqrt = np.real(sqrtm(Cxx))
-        Cyy_sqrt = np.real(sqrtm(Cyy))
-        Cxx_inv_sqrt = np.linalg.inv(Cxx_sqrt)
-        Cyy_inv_sqrt = np.linalg.inv(Cyy_sqrt)
+        Lx = cholesky(Cxx, lower=True)
     except (np.linalg.LinAlgError, ValueError):
-        return np.array([0.0])
-    M = Cxx_inv_sqrt @ Cxy @ Cyy_inv_sqrt
-    M = np.real(M)
-    _, s, _ = np.linalg.svd(M, full_matrices=False)
-    return np.clip(s, 0.0, 1.0)
+        return [np.array([0.0])] * n_targets
+    XtY = X.T @ Y_all
+    XtY /= n
+    W = solve_triangular(Lx, XtY, lower=True, overwrite_b=True)
+    width = Y_all.shape[1] // n_targets
+    correlations = []
+    for t, Ly in enumerate(Lys):
+        if Ly is None:
+            correlations.append(np.array([0.0]))
+            continue
+        M = solve_triangular(Ly, W[:, t * width:(t + 1) * width].T, lower=True).T
+        s = np.linalg.svd(M, compute_uv=False)
+        correlations.append(np.clip(s, 0.0, 1.0, out=s))
+    return correlations
 
 
 def _detect_ssvep_cca(
@@ -239,21 +499,17 @@ def _detect_ssvep_cca(
     n_harmonics: int = 2,
     cca_components: int = 1,
     cca_reg: float = 1e-4,
+    sos: Optional[np.ndarray] = None,
 ) -> Tuple[int, float, float]:
     """CCA-based detection: reference signals at f and harmonics; max canonical correlation wins."""
     if data is None or data.size == 0:
         return 0, 0.0, 0.0
-    # bandpass_filter expects time on last axis; data is (samples, channels)
-    filtered = bandpass_filter(
-        data.T, low_hz=bandpass_low, high_hz=bandpass_high, fs=fs, order=filter_order
-    ).T
-    if car and filtered.shape[1] > 1:
-        filtered = common_average_reference(filtered, axis=1)
-    n_samples = filtered.shape[0]
-    Y_left = _build_cca_reference(n_samples, fs, freq_left_hz, n_harmonics=n_harmonics)
-    Y_right = _build_cca_reference(n_samples, fs, freq_right_hz, n_harmonics=n_harmonics)
-    r_left = _cca_correlation(filtered, Y_left, reg=cca_reg)
-    r_right = _cca_correlation(filtered, Y_right, reg=cca_reg)
+    # data is (samples, channels); filter along axis 0
+    filtered = preprocess(data, fs, bandpass_low, bandpass_high, filter_order, car, sos=sos)
+    Y_all, Lys = _cca_reference_stack(
+        filtered.shape[0], fs, (freq_left_hz, freq_right_hz), n_harmonics, cca_reg
+    )
+    r_left, r_right = _cca_correlations_batched(filtered, Y_all, Lys, reg=cca_reg)
     score_left = float(np.sum(r_left[:cca_components]))
     score_right = float(np.sum(r_right[:cca_components]))
     selected = 1 if score_right > score_left else 0
@@ -275,10 +531,20 @@ def detect_ssvep_multi(
     cca_components: int = 1,
     cca_reg: float = 1e-4,
     rest_threshold: Optional[float] = None,
+    sos: Optional[np.ndarray] = None,
+    filter_bank: Optional[Sequence[np.ndarray]] = None,
+    aggregate: str = "power_mean",
 ) -> Tuple[int, List[float]]:
     """
     Detect among N SSVEP targets; optional rest when max score below rest_threshold.
 
+    `method` is "fft", "cca" or "fbcca" (filter-bank CCA: weighted sum of squared
+    correlations over sub-bands, see design_filter_bank). `sos` is an optional
+    precomputed bandpass; `filter_bank` the precomputed fbCCA sub-band SOS list
+    (designed per call from FBCCA_SUBBANDS_HZ if omitted). For "fft", `aggregate` is
+    "power_mean" (per-channel FFT, power averaged across channels) or "mean" (FFT of
+    the channel mean, which CAR reduces to zero; kept for car=False setups).
+
     Returns
     -------
     tuple
@@ -297,28 +563,119 @@ def detect_ssvep_multi(
             n_harmonics=cca_n_harmonics,
             cca_components=cca_components,
             cca_reg=cca_reg,
+            sos=sos,
+        )
+    elif method == "fbcca":
+        idx, scores = _detect_ssvep_multi_fbcca(
+            data, fs, freqs_hz,
+            car=car,
+            filter_bank=filter_bank if filter_bank is not None else design_filter_bank(fs, order=filter_order),
+            n_harmonics=cca_n_harmonics,
+            cca_components=cca_components,
+            cca_reg=cca_reg,
         )
     else:
-        filtered = bandpass_filter(
-            data.T, low_hz=bandpass_low, high_hz=bandpass_high, fs=fs, order=filter_order
-        ).T
-        if car and filtered.shape[1] > 1:
-            filtered = common_average_reference(filtered, axis=1)
-        ch_series = np.mean(filtered, axis=1)
-        scores = [
-            power_at_frequency(
-                ch_series, fs, f,
-                tol_hz=freq_tol_hz,
-                use_second_harmonic=use_second_harmonic,
-            )
-            for f in freqs_hz
-        ]
+        filtered = preprocess(data, fs, bandpass_low, bandpass_high, filter_order, car, sos=sos)
+        # One (multi-channel) FFT call shared by all targets
+        scores = _target_powers(
+            _fft_input(filtered, aggregate), fs, freqs_hz,
+            tol_hz=freq_tol_hz,
+            use_second_harmonic=use_second_harmonic,
+        ).tolist()
         idx = int(np.argmax(scores))
     if rest_threshold is not None and len(scores) > 0 and max(scores) < rest_threshold:
         idx = -1
     return idx, scores
 
 
+def make_detector(
+    fs: float,
+    freqs_hz: Sequence[float],
+    *,
+    method: str = "fft",
+    bandpass_low: float = 5.0,
+    bandpass_high: float = 30.0,
+    filter_order: int = 4,
+    car: bool = True,
+    freq_tol_hz: float = 0.5,
+    use_second_harmonic: bool = True,
+    cca_n_harmonics: int = 2,
+    cca_components: int = 1,
+    cca_reg: float = 1e-4,
+    rest_threshold: Optional[float] = None,
+    aggregate: str = "power_mean",
+) -> Callable[..., Tuple[int, List[float]]]:
+    """
+    detect_ssvep_multi specialized for a fixed session configuration.
+
+    Filters (bandpass SOS, fbCCA sub-bands) are designed and specialized here once
+    (make_sos_filtfilt); FFT bin ranges and CCA references (+ Cholesky factors) are
+    built on first use per window length and kept in the closure. The returned `detect(data)` runs only
+    filter -> CAR -> FFT/CCA and gives the same result as detect_ssvep_multi.
+    For "fft"/"cca", `detect(data, filtered)` skips preprocessing when the caller
+    already has preprocess(data, ...) for this window (e.g. from the spectrum chart).
+
+    Returns
+    -------
+    callable
+        detect(data, filtered=None) -> (selected_index 0..N-1 or -1 for rest, list of N scores).
+    """
+    freqs = tuple(float(f) for f in freqs_hz)
+    n_targets = len(freqs)
+    sos = design_bandpass(bandpass_low, bandpass_high, fs, order=filter_order)
+    band = make_sos_filtfilt(sos) if sos is not None else None
+    filter_bank = design_filter_bank(fs, order=filter_order) if method == "fbcca" else []
+    sub_filters = [make_sos_filtfilt(sos_k) for sos_k in filter_bank]
+    fb_weights = fbcca_weights(len(filter_bank))
+    per_window: Dict[int, tuple] = {}  # n_samples -> FFT edges or (Y_all, Lys)
+
+    def window_invariants(n: int) -> tuple:
+        inv = per_window.get(n)
+        if inv is None:
+            if method in ("cca", "fbcca"):
+                inv = _cca_reference_stack(n, fs, freqs, cca_n_harmonics, cca_reg)
+            else:
+                inv = _fft_band_edges(n, fs, freqs, freq_tol_hz, use_second_harmonic)
+            if len(per_window) >= 8:  # window still growing while the buffer fills
+                per_window.clear()
+            per_window[n] = inv
+        return inv
+
+    def detect(data: np.ndarray, filtered: Optional[np.ndarray] = None) -> Tuple[int, List[float]]:
+        if data is None or data.size == 0 or n_targets == 0:
+            return 0, [0.0] * n_targets
+        inv = window_invariants(data.shape[0])
+        if method != "fbcca" and filtered is None:
+            filtered = preprocess(
+                data, fs, bandpass_low, bandpass_high, filter_order, car, sos=sos, bandpass=band
+            )
+        if method == "cca":
+            Y_all, Lys = inv
+            scores = [
+                float(np.sum(r[:cca_components]))
+                for r in _cca_correlations_batched(filtered, Y_all, Lys, reg=cca_reg)
+            ]
+        elif method == "fbcca":
+            Y_all, Lys = inv
+            x = data
+            if car and x.shape[1] > 1:  # CAR before the sub-band filters
+                x = common_average_reference(x, axis=1)
+            acc = np.zeros(n_targets)
+            for w_k, sub_filter in zip(fb_weights, sub_filters):
+                sub = sub_filter(x)
+                for i, r in enumerate(_cca_correlations_batched(sub, Y_all, Lys, reg=cca_reg)):
+                    acc[i] += w_k * float(np.sum(r[:cca_components])) ** 2
+            scores = acc.tolist()
+        else:
+            scores = _target_powers(_fft_input(filtered, aggregate), fs, freqs, edges=inv).tolist()
+        idx = int(np.argmax(scores))
+        if rest_threshold is not None and max(scores) < rest_threshold:
+            idx = -1
+        return idx, scores
+
+    return detect
+
+
 def _detect_ssvep_multi_cca(
     data: np.ndarray,
     fs: float,
@@ -330,27 +687,51 @@ def _detect_ssvep_multi_cca(
     n_harmonics: int = 2,
     cca_components: int = 1,
     cca_reg: float = 1e-4,
+    sos: Optional[np.ndarray] = None,
 ) -> Tuple[int, List[float]]:
     """CCA for N frequencies; returns index of max score and list of scores."""
     if data is None or data.size == 0 or len(freqs_hz) == 0:
         return 0, []
-    filtered = bandpass_filter(
-        data.T, low_hz=bandpass_low, high_hz=bandpass_high, fs=fs, order=filter_order
-    ).T
-    if car and filtered.shape[1] > 1:
-        filtered = common_average_reference(filtered, axis=1)
-    n_samples = filtered.shape[0]
-    scores = []
-    for f_hz in freqs_hz:
-        Y = _build_cca_reference(n_samples, fs, f_hz, n_harmonics=n_harmonics)
-        r = _cca_correlation(filtered, Y, reg=cca_reg)
-        scores.append(float(np.sum(r[:cca_components])))
+    filtered = preprocess(data, fs, bandpass_low, bandpass_high, filter_order, car, sos=sos)
+    Y_all, Lys = _cca_reference_stack(filtered.shape[0], fs, tuple(freqs_hz), n_harmonics, cca_reg)
+    scores = [
+        float(np.sum(r[:cca_components]))
+        for r in _cca_correlations_batched(filtered, Y_all, Lys, reg=cca_reg)
+    ]
     idx = int(np.argmax(scores))
     return idx, scores
 
 
+def _detect_ssvep_multi_fbcca(
+    data: np.ndarray,
+    fs: float,
+    freqs_hz: List[float],
+    car: bool,
+    filter_bank: Sequence[np.ndarray],
+    n_harmonics: int = 2,
+    cca_components: int = 1,
+    cca_reg: float = 1e-4,
+) -> Tuple[int, List[float]]:
+    """Filter-bank CCA: score_f = sum_k w_k * rho_k(f)^2 over sub-bands k."""
+    if data is None or data.size == 0 or len(freqs_hz) == 0 or len(filter_bank) == 0:
+        return 0, [0.0] * len(freqs_hz)
+    # CAR is linear, so apply once before the sub-band filters
+    if car and data.shape[1] > 1:
+        data = common_average_reference(data, axis=1)
+    Y_all, Lys = _cca_reference_stack(data.shape[0], fs, tuple(freqs_hz), n_harmonics, cca_reg)
+    weights = fbcca_weights(len(filter_bank))
+    scores = np.zeros(len(freqs_hz))
+    for w_k, sos in zip(weights, filter_bank):
+        sub = _sosfiltfilt_keep_dtype(sos, data, axis=0)
+        for i, r in enumerate(_cca_correlations_batched(sub, Y_all, Lys, reg=cca_reg)):
+            rho = float(np.sum(r[:cca_components]))
+            scores[i] += w_k * rho ** 2
+    idx = int(np.argmax(scores))
+    return idx, scores.tolist()
+
+
 def get_smoothed_selection(
-    history: List[int],
+    history: Sequence[int],
     min_agreements: int = 2,
     n_classes: Optional[int] = None,
 ) -> Optional[int]:
@@ -358,13 +739,18 @@ def get_smoothed_selection(
     Require `min_agreements` same consecutive results before returning class index.
     Supports 2 classes (0, 1) or N classes (0..N-1); use n_classes to allow 0..n_classes-1.
     Returns None if not enough agreement (no feedback).
+    `history` may be a list or a 1D integer ndarray (e.g. a ring-buffer view), oldest first.
     """
     if len(history) < min_agreements:
         return None
-    recent = history[-min_agreements:]
+    recent = np.asarray(history[-min_agreements:], dtype=np.intp)
     if n_classes is None:
         n_classes = 2
-    for c in range(n_classes):
-        if all(x == c for x in recent):
-            return c
+    if recent.size == 0 or recent.min() < 0:
+        return None
+    # All recent entries agree iff one class accounts for every vote
+    counts = np.bincount(recent, minlength=n_classes)
+    best = int(counts.argmax())
+    if best < n_classes and counts[best] >= min_agreements:
+        return best
     return None
@@ -0,0 +1,10 @@
+"""
+Shared pytest configuration for the SSVEP test suite.
+
+Makes the ``ssvep/`` scripts importable as top-level modules (as ``app.py`` does).
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,98 @@
+"""
+Tests for the EEGStream ring buffer (no BrainAccess device needed).
+
+Usage
+-----
+Run from the ``ssvep/`` directory::
+
+    python -m pytest tests/test_eeg_stream.py -v
+
+"""
+
+from collections import deque
+
+import numpy as np
+
+from eeg_stream import EEGStream
+
+CHANNELS = ["O1", "O2", "P3"]
+FS = 10
+BUFFER_SECONDS = 2  # 20-row ring
+
+
+def _stream(**kwargs) -> EEGStream:
+    return EEGStream(CHANNELS, sampling_rate=FS, buffer_seconds=BUFFER_SECONDS, **kwargs)
+
+
+def _rows(start: int, n: int) -> np.ndarray:
+    """(n, n_channels) block whose values encode sample number and channel."""
+    idx = np.arange(start, start + n, dtype=np.float32)[:, None]
+    return idx * 10 + np.arange(len(CHANNELS), dtype=np.float32)
+
+
+def _append(stream: EEGStream, block: np.ndarray) -> None:
+    stream._append(block, np.zeros(block.shape[0]))
+
+
+def test_empty_buffer():
+    data, names = _stream().get_recent(1.0)
+    assert data is None
+    assert names == CHANNELS
+
+
+def test_wrapped_reads_match_deque():
+    """Reads across the wrap point return the same rows as the old deque(maxlen) buffer."""
+    stream = _stream()
+    reference: deque = deque(maxlen=FS * BUFFER_SECONDS)
+    total = 0
+    for size in (7, 9, 11, 3, 15, 1, 20, 6):
+        block = _rows(total, size)
+        _append(stream, block)
+        reference.extend(block.tolist())
+        total += size
+        for seconds in (0.3, 1.0, 1.7, 2.0, 5.0):
+            data, _ = stream.get_recent(seconds)
+            n = min(int(seconds * FS), len(reference))
+            expected = np.array(list(reference)[-n:], dtype=np.float32)
+            assert data.dtype == np.float32
+            np.testing.assert_array_equal(data, expected)
+    assert stream.samples_received == total
+
+
+def test_chunk_longer_than_buffer():
+    """Only the tail of an oversized chunk is kept, but every sample is counted."""
+    stream = _stream()
+    _append(stream, _rows(0, 5))
+    block = _rows(5, 47)
+    _append(stream, block)
+    data, _ = stream.get_recent(10.0)
+    np.testing.assert_array_equal(data, block[-FS * BUFFER_SECONDS:])
+    assert stream.samples_received == 52
+
+
+def test_get_recent_returns_scaled_copy():
+    stream = _stream(raw_to_uv_scale=0.5)
+    _append(stream, _rows(0, 4))
+    data, _ = stream.get_recent(1.0)
+    np.testing.assert_allclose(data, _rows(0, 4) * 0.5)
+    data[:] = -1.0  # caller owns the copy; buffer is unchanged
+    np.testing.assert_allclose(stream.get_recent(1.0)[0], _rows(0, 4) * 0.5)
+
+
+def test_on_chunk_zero_fills_missing_and_short_channels():
+    """Unmapped channels and chunk arrays shorter than chunk_size stay zero."""
+    stream = _stream()
+    # O1 -> chunk array 0, O2 -> array 2 (short), P3 not available
+    stream._ch_idx = np.array([0, 2, -1], dtype=np.intp)
+    chunk_arrays = [
+        np.arange(1, 6, dtype=np.float64),
+        np.full(5, 99.0),
+        np.array([7.0, 8.0]),
+    ]
+    stream._on_chunk(chunk_arrays, 5)
+    data, _ = stream.get_recent(1.0)
+    expected = np.zeros((5, 3), dtype=np.float32)
+    expected[:, 0] = [1, 2, 3, 4, 5]
+    expected[:2, 1] = [7, 8]
+    np.testing.assert_array_equal(data, expected)
+    assert stream.samples_received == 5
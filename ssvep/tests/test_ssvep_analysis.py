@@ -0,0 +1,90 @@
+"""
+Smoke tests for ssvep_analysis on float32 windows as returned by EEGStream.get_recent.
+
+Usage
+-----
+Run from the ``ssvep/`` directory::
+
+    python -m pytest tests -v
+
+"""
+
+import numpy as np
+import pytest
+from scipy import signal as scipy_signal
+
+from ssvep_analysis import (
+    bandpass_filter,
+    compute_power_spectrum,
+    design_bandpass,
+    detect_ssvep_multi,
+    make_detector,
+    make_sos_filtfilt,
+)
+
+FS = 250.0
+# No target at another target's second harmonic (FFT scores include 2f)
+FREQS_HZ = [6.0, 7.5, 10.0]
+
+
+def _window(freq_hz: float, seconds: float = 3.0, n_channels: int = 8, seed: int = 0) -> np.ndarray:
+    """(n_samples, n_channels) float32 noise with an SSVEP at freq_hz on the last two (occipital) channels."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * FS)) / FS
+    data = rng.normal(0.0, 20.0, size=(t.size, n_channels))
+    data[:, -2:] += 40.0 * np.sin(2 * np.pi * freq_hz * t)[:, None]
+    return data.astype(np.float32)
+
+
+def test_bandpass_filter_float32():
+    """Filtering a float32 window works with the cached SOS and keeps dtype/shape."""
+    data = _window(7.5).T
+    out = bandpass_filter(data, 5.0, 30.0, FS, order=4)
+    assert out.dtype == np.float32
+    assert out.shape == data.shape
+    again = bandpass_filter(data, 5.0, 30.0, FS, order=4, sos=design_bandpass(5.0, 30.0, FS))
+    np.testing.assert_allclose(out, again)
+
+
+@pytest.mark.parametrize("method", ["fft", "cca", "fbcca"])
+@pytest.mark.parametrize("target", range(len(FREQS_HZ)))
+def test_detect_ssvep_multi(method, target):
+    """The stimulated target wins with CAR on."""
+    idx, scores = detect_ssvep_multi(_window(FREQS_HZ[target], seed=target), FS, FREQS_HZ, method=method, car=True)
+    assert len(scores) == len(FREQS_HZ)
+    assert all(np.isfinite(scores))
+    assert idx == target
+
+
+def test_make_sos_filtfilt_matches_sosfiltfilt():
+    """Specialized filter gives the same result as scipy's sosfiltfilt along axis 0."""
+    data = _window(6.0).astype(np.float64)
+    sos = design_bandpass(5.0, 30.0, FS, order=4)
+    expected = scipy_signal.sosfiltfilt(sos, data, axis=0)
+    np.testing.assert_allclose(make_sos_filtfilt(sos)(data), expected, rtol=1e-7, atol=1e-9)
+
+
+@pytest.mark.parametrize("method", ["fft", "cca", "fbcca"])
+@pytest.mark.parametrize("target", range(len(FREQS_HZ)))
+def test_make_detector_float32(method, target):
+    """Detector specialized for the session matches detect_ssvep_multi on a float32 window."""
+    data = _window(FREQS_HZ[target], seed=target)
+    idx, scores = make_detector(FS, FREQS_HZ, method=method, car=True)(data)
+    assert idx == target
+    np.testing.assert_allclose(scores, detect_ssvep_multi(data, FS, FREQS_HZ, method=method, car=True)[1])
+
+
+def test_compute_power_spectrum():
+    """Spectrum peaks at the stimulus frequency with CAR on (per-channel power, not the zero channel mean)."""
+    freqs, powers = compute_power_spectrum(_window(15.0), FS, freq_max_hz=16.0, car=True)
+    assert freqs.shape == powers.shape
+    assert freqs[np.argmax(powers)] == pytest.approx(15.0)
+
+
+def test_cca_float32_large_amplitude_with_car():
+    """CAR makes Cxx rank-deficient; CCA must still factor it for large float32 windows."""
+    for seed in range(10):
+        data = _window(7.5, seed=seed) * np.float32(15.0)  # ~300 µV noise, covariance entries ~1e5
+        idx, scores = detect_ssvep_multi(data, FS, FREQS_HZ, method="cca", car=True)
+        assert idx == 1
+        assert min(scores) > 0.0